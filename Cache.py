@@ -0,0 +1,51 @@
+# Binary memory-mapped cache for the CSV data loaders
+# Licensed under the MIT Licence
+
+import numpy as np
+import hashlib
+import os
+
+directory = os.environ.get('FIRM_CACHE', 'Data/Cache')
+
+def Key(path, kwargs):
+    """Hashes of the genfromtxt arguments and of the source file contents"""
+
+    source = hashlib.sha1()
+    with open(path, 'rb') as csvfile:
+        for block in iter(lambda: csvfile.read(1 << 20), b''):
+            source.update(block)
+    arguments = hashlib.sha1(repr(sorted(kwargs.items())).encode())
+
+    return arguments.hexdigest()[:8], source.hexdigest()[:16]
+
+def Load(path, **kwargs):
+    """array = Cache.Load('Data/pv.csv', delimiter=',', ...) in place of np.genfromtxt.
+
+    The first call parses the CSV with np.genfromtxt and saves the result as .npy; later calls memory-map the .npy
+    read-only. The cache file is keyed by the arguments and the source file hash, so it is rebuilt whenever the
+    CSV changes, and the cache built from the previous version of the CSV is removed."""
+
+    name = os.path.basename(path).rsplit('.', 1)[0]
+    arguments, source = Key(path, kwargs)
+    prefix = '{}_{}_'.format(name, arguments)
+    cache = os.path.join(directory, '{}{}.npy'.format(prefix, source))
+
+    if not os.path.exists(cache):
+        data = np.genfromtxt(path, **kwargs)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            temporary = '{}.{}.tmp'.format(cache, os.getpid())
+            with open(temporary, 'wb') as npyfile:
+                np.save(npyfile, data)
+            os.replace(temporary, cache) # Atomic, so concurrent processes never read a partial file
+        except OSError:
+            return data
+
+        for stale in os.listdir(directory):
+            if stale.startswith(prefix) and stale.endswith('.npy') and stale != os.path.basename(cache):
+                try:
+                    os.remove(os.path.join(directory, stale))
+                except OSError:
+                    pass
+
+    return np.load(cache, mmap_mode='r')
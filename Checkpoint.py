@@ -0,0 +1,84 @@
+# Checkpoints of the differential evolution, to resume a run stopped by the walltime or a failure
+# Licensed under the MIT Licence
+
+from scipy.optimize._differentialevolution import DifferentialEvolutionSolver # The solver of differential_evolution
+import numpy as np
+import pickle
+import os
+
+interval = int(os.environ.get('FIRM_CHECKPOINT', 10)) # Generations between checkpoints; 0 for none
+
+def Path(suffix):
+    """Checkpoint file of a scenario, e.g. Results/checkpoint_APG_Full_HVAC_5_True_True.pkl"""
+    return 'Results/checkpoint{}'.format(suffix.replace('.csv', '.pkl'))
+
+def Save(path, solver, nit, callbacks=()):
+    """Write the population (unit-scaled, as held by the solver), the fitness values, the best solution, the
+    generation, the random number generator state and that of the callbacks with a state() method, by class name.
+    Written to a temporary file and renamed, so a kill mid-write leaves the previous checkpoint intact"""
+
+    rng = solver.random_number_generator
+    state = {'nit': nit, 'population': solver.population, 'population_energies': solver.population_energies,
+             'x': solver.x, 'fun': solver.population_energies[0],
+             'rng': rng.bit_generator.state if isinstance(rng, np.random.Generator) else rng.get_state(),
+             'callbacks': {type(c).__name__: c.state() for c in callbacks if hasattr(c, 'state')}}
+
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as pklfile:
+        pickle.dump(state, pklfile, protocol=pickle.HIGHEST_PROTOCOL)
+        pklfile.flush()
+        os.fsync(pklfile.fileno())
+    os.replace(temporary, path)
+
+def Load(path):
+    """The last checkpoint written to path, or None"""
+
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as pklfile:
+        return pickle.load(pklfile)
+
+def Restore(solver, state, callbacks=()):
+    """Continue a new solver from a checkpoint: same population, fitness values and random numbers, and the callbacks
+    with a restore(solver, nit, state) method from their saved state"""
+
+    if solver.population.shape != state['population'].shape:
+        raise ValueError('Checkpoint population of shape {} does not match {}'.format(state['population'].shape, solver.population.shape))
+
+    solver.population[:] = state['population']
+    solver.population_energies[:] = state['population_energies'] # Not all inf, so solve() does not evaluate them again
+    rng = solver.random_number_generator
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state['rng']
+    else:
+        rng.set_state(state['rng'])
+
+    saved = state.get('callbacks', {}) # None in the checkpoints of earlier versions
+    for c in callbacks:
+        if hasattr(c, 'restore') and type(c).__name__ in saved:
+            c.restore(solver, state['nit'], saved[type(c).__name__])
+
+def Solve(path, state=None, callbacks=(), maxiter=1000, **kwargs):
+    """result = Checkpoint.Solve(path, state, [pool.advance], func=F, bounds=..., maxiter=...) in place of
+    differential_evolution(func=F, bounds=..., maxiter=..., callback=...). Writes a checkpoint to path every interval
+    generations and continues from state (Checkpoint.Load) up to the same maxiter. The callbacks are called as
+    callback(solver, generation) and a callback returning True stops. The state of the callbacks, e.g. the training data
+    of Surrogate.Screen or the history of Telemetry, is saved and restored with the solver's"""
+
+    nit = state['nit'] if state is not None else 0
+
+    def callback(xk, convergence):
+        nonlocal nit
+        nit += 1
+        stop = any([bool(c(solver, nit)) for c in callbacks])
+        if interval > 0 and (nit % interval == 0 or stop):
+            Save(path, solver, nit, callbacks)
+        return stop
+
+    with DifferentialEvolutionSolver(maxiter=maxiter - nit, callback=callback, **kwargs) as solver:
+        if state is not None:
+            Restore(solver, state, callbacks)
+        result = solver.solve()
+    result.nit = nit
+
+    return result
@@ -0,0 +1,94 @@
+# Command-line options and the scenario configuration they select
+# Licensed under the MIT Licence
+
+from argparse import ArgumentParser
+
+def Parser(matrix=False):
+    """Command-line options of Optimisation.py; with matrix=True, -e -n -s -b -H take lists of values (Scheduler.py)"""
+
+    parser = ArgumentParser()
+    nargs = '+' if matrix else None
+    parser.add_argument('-i', default=2000, type=int, required=False, help='maxiter=4000, 400')
+    parser.add_argument('-p', default=5, type=int, required=False, help='popsize=2, 10')
+    parser.add_argument('-m', default='0.5', type=str, required=False, help='mutation=0.5, or a range 0.3:0.9 (dithering, or spread over the islands)')
+    parser.add_argument('-r', default='0.3', type=str, required=False, help='recombination=0.3, or a range 0.1:0.9 with -I')
+    parser.add_argument('-e', nargs=nargs, default=5, type=int, required=False, help='per-capita electricity = 5, 10, 20 MWh/year')
+    parser.add_argument('-n', nargs=nargs, default='APG_MY_Isolated', type=str, required=False, help='APG_Full, APG_PMY_Only, APG_BMY_Only, APG_MY_Isolated, SB, SW...')
+    parser.add_argument('-s', nargs=nargs, default='HVAC', type=str, required=False, help='HVDC, HVAC')
+    parser.add_argument('-H', nargs=nargs, default='True', type=str, required=False, help='Hydrogen Firming=True,False')
+    parser.add_argument('-b', nargs=nargs, default='True', type=str, required=False, help='Battery Coopimisation=True,False')
+    parser.add_argument('-v', default='False', type=str, required=False, help='Vectorised population objective=True,False')
+    parser.add_argument('-R', default='all', type=str, required=False, help='Recording policy=all, top:k (per generation), every:n (evaluations), below:penalty')
+    parser.add_argument('-S', default=0, type=int, required=False, help='Stop after this many generations without relative improvement above -E; 0 runs all -i')
+    parser.add_argument('-E', default=0.001, type=float, required=False, help='Relative improvement of the best objective for -S=0.001')
+    parser.add_argument('-F', default='False', type=str, required=False, help='Count -S generations only while the best candidate is feasible=True,False')
+    parser.add_argument('-I', default='False', type=str, required=False, help='Island model, one sub-population per worker=True,False')
+    parser.add_argument('-M', default=20, type=int, required=False, help='Generations between migrations of the islands=20')
+    parser.add_argument('-w', default=None, type=int, required=False, help='worker processes=cpu_count()')
+
+    return parser
+
+def Flag(value, option):
+    """'True' or 'False' option to bool"""
+
+    if value == "True":
+        return True
+    elif value == "False":
+        return False
+    else:
+        print("{} must be True or False".format(option))
+        exit()
+
+def Range(value, option):
+    """'0.5' or '0.3:0.9' option to a (low, high) range"""
+
+    try:
+        values = [float(x) for x in value.split(':')]
+        if len(values) in (1, 2) and values[0] <= values[-1]:
+            return (values[0], values[-1])
+    except ValueError:
+        pass
+    print("{} must be a number or a range low:high".format(option))
+    exit()
+
+def Policy(value, option):
+    """'all', 'top:k', 'every:n' or 'below:penalty' option to a (name, value) recording policy"""
+
+    name, _, number = value.partition(':')
+    try:
+        if name == 'all' and not number:
+            return ('all', None)
+        elif name in ('top', 'every') and int(number) > 0:
+            return (name, int(number))
+        elif name == 'below':
+            return (name, float(number))
+    except ValueError:
+        pass
+    print("{} must be all, top:k, every:n or below:penalty".format(option))
+    exit()
+
+def Parse(argv=None, parser=None):
+    """args = Config.Parse() parses the command line, optionally with a Parser() extended by the calling script"""
+
+    args = (parser if parser is not None else Parser()).parse_args(argv)
+    args.H, args.b, args.v, args.F = (Flag(args.H, '-H'), Flag(args.b, '-b'), Flag(args.v, '-v'), Flag(args.F, '-F'))
+    args.R = Policy(args.R, '-R')
+    args.I, args.m, args.r = (Flag(args.I, '-I'), Range(args.m, '-m'), Range(args.r, '-r'))
+
+    return args
+
+def Scenario(args):
+    """Arguments of Input.Context from the parsed command line"""
+
+    return {'node': args.n, 'scenario': args.s, 'percapita': args.e, 'battery': args.b, 'gas': args.H}
+
+def Suffix(config):
+    """Results file name suffix of a scenario, e.g. '_APG_Full_HVAC_5_True_True.csv', or of a coarse context of it,
+    e.g. '_APG_Full_HVAC_5_True_True_3h_2y.csv' at 3-hour resolution over the first 2 years, or '_..._True_True_40d.csv'
+    on 40 representative days"""
+
+    fidelity = '_{}h'.format(config['resolution']) if config.get('resolution', 1) != 1 else ''
+    fidelity += '_{}y'.format(config['span']) if config.get('span') is not None else ''
+    fidelity += '_{}d'.format(config['days']) if config.get('days') is not None else ''
+
+    return '_{}_{}_{}_{}_{}{}.csv'.format(config['node'], config['scenario'], config['percapita'], config['battery'], config['gas'], fidelity)
@@ -3,59 +3,76 @@
 # Licensed under the MIT Licence
 # Correspondence: bin.lu@anu.edu.au
 
-from Input import *
+from Input import Solution
 from Simulation import Reliability
 
+import numpy as np
 import datetime as dt
-from multiprocessing import Pool, cpu_count
+from Workers import WorkerPool
+from multiprocessing import cpu_count
+import Config
 
 def Flexible(instance):
-    """Energy source of high flexibility"""
+    """Energy source of high flexibility: the peaking hydro and bio (MW) of one year, on top of the baseload hydro"""
 
-    year, x = instance
+    year, x, context = instance
     print('Dispatch works on', year)
 
-    S = Solution(x)
+    steps, resolution, firstyear, timestep, CPeak = (context.steps, context.resolution, context.firstyear, context.timestep, context.CPeak)
 
-    startidx = int((24 / resolution) * (dt.datetime(year, 1, 1) - dt.datetime(firstyear, 1, 1)).days)
-    endidx = int((24 / resolution) * (dt.datetime(year+1, 1, 1) - dt.datetime(firstyear, 1, 1)).days)
+    S = Solution(x, context)
+
+    startidx = (year - firstyear) * steps # Years of 8760 hours, as the time series
+    endidx = startidx + steps
 
     Fcapacity = CPeak.sum() * pow(10, 3) # GW to MW
     flexible = Fcapacity * np.ones(endidx - startidx)
+    hydro, bio, gas = (context.baseload[startidx: endidx], np.zeros(endidx - startidx), np.zeros(endidx - startidx))
 
     for i in range(0, endidx - startidx, timestep):
         flexible[i: i+timestep] = 0
-        Deficit, DeficitD = Reliability(S, flexible=flexible, start=startidx, end=endidx) # Sj-EDE(t, j), MW
-        if (Deficit + DeficitD).sum() * resolution > 0.1:
+        Deficit = Reliability(S, hydro=hydro + flexible, bio=bio, gas=gas, start=startidx, end=endidx)[2] # Sj-EDE(t, j), MW
+        if Deficit.sum() * resolution > 0.1:
             flexible[i: i+timestep] = Fcapacity
 
+    Reliability(S, hydro=hydro + flexible, bio=bio, gas=gas, start=startidx, end=endidx)
     flexible = np.clip(flexible - S.Spillage, 0, None)
 
     return flexible
 
-def Analysis(x):
-    """Dispatch.Analysis(result.x)"""
+def Analysis(x, context, pool=None):
+    """Dispatch.Analysis(result.x, context), or Dispatch.Analysis(result.x, context, pool) reusing the workers of the optimisation"""
 
     starttime = dt.datetime.now()
     print('Dispatch starts at', starttime)
 
+    firstyear, years = (context.firstyear, context.years)
+
     # Multiprocessing
-    pool = Pool(processes=min(cpu_count(), finalyear - firstyear + 1))
-    instances = map(lambda y: [y] + [x], range(firstyear, finalyear + 1))
-    Dispresult = pool.map(Flexible, instances)
-    pool.terminate()
+    workers = pool if pool is not None else WorkerPool(context.config(), processes=min(cpu_count(), years))
+    instances = map(lambda y: [y] + [x] + [context], range(firstyear, firstyear + years))
+    Dispresult = workers.map(Flexible, instances)
+    if pool is None:
+        workers.close()
 
     Flex = np.concatenate(Dispresult)
-    np.savetxt('Results/Dispatch_Flexible{}.csv'.format(scenario), Flex, fmt='%f', delimiter=',', newline='\n', header='Flexible energy resources')
+    np.savetxt('Results/Dispatch_Flexible{}.csv'.format(context.scenario), Flex, fmt='%f', delimiter=',', newline='\n', header='Flexible energy resources')
 
     endtime = dt.datetime.now()
     print('Dispatch took', endtime - starttime)
 
+    # Peaking supply shared by the hydro above its baseload and the bio in proportion to their capacities
+    share = (context.CHydro.sum() - context.CBaseload.sum()) / context.CPeak.sum() if context.CPeak.sum() > 0 else 0
+    hydro, bio, gas = (context.baseload + share * Flex, (1 - share) * Flex, np.zeros(context.intervals))
+
     from Statistics import Information
-    Information(x, Flex)
+    Information(x, hydro, bio, gas, context)
 
     return True
 
 if __name__ == '__main__':
-    capacities = np.genfromtxt('Results/Optimisation_resultx.csv', delimiter=',', skip_header=1)
-    Analysis(capacities)
\ No newline at end of file
+    from Input import Context
+
+    context = Context(**Config.Scenario(Config.Parse()))
+    capacities = np.genfromtxt('Results/Optimisation_resultx{}'.format(context.suffix), delimiter=',')
+    Analysis(capacities, context)
\ No newline at end of file
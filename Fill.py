@@ -4,12 +4,12 @@ Created on Mon Dec  7 14:17:37 2020
 @author: cheng + tim
 """
 
-from Input import *
-from Simulation import Reliability
+from Input import Solution
+from Simulation import Reliability, Reliabilities
 import numpy as np
 import datetime as dt
 
-def fill_deficit(deficit,hydro,bio,gas,hydro_limit,bio_limit,gas_limit,hydro_annual,bio_annual,gas_annual,hflag,bflag,gflag,eff,step):
+def fill_deficit(deficit,hydro,bio,gas,hydro_limit,bio_limit,gas_limit,hydro_annual,bio_annual,gas_annual,hflag,bflag,gflag,eff,step,steps=8760):
     idx = np.where(deficit > 0)[0]
     for idd, i in np.ndenumerate(idx):
         d = deficit[i]
@@ -20,9 +20,9 @@ def fill_deficit(deficit,hydro,bio,gas,hydro_limit,bio_limit,gas_limit,hydro_ann
         try:
             while d > 0 and t >= 0 and count < step:
                 #print("t = ",t)
-                year = t // 8760
-                start = year * 8760
-                end = (year+1) * 8760
+                year = t // steps
+                start = year * steps
+                end = (year+1) * steps
                 if t == i - 1:
                     ######## ADD BATTERY EFFICIENCY? #############
                     d = d / eff
@@ -72,28 +72,47 @@ def save(h,b,g,suffix):
     np.savetxt('Results/Dispatch_Bio' + suffix, b, fmt='%f', delimiter=',', newline='\n', header='Bio')
     np.savetxt('Results/Dispatch_Gas' + suffix, g, fmt='%f', delimiter=',', newline='\n', header='Gas')
     
-def maxx(x):
-    return np.reshape(x, (-1, 8760)).sum(axis=-1).max()/1e6
+def maxx(x, steps=8760):
+    return np.reshape(x, (-1, steps)).sum(axis=-1).max()/1e6
 
-def mean(x):
+def mean(x, years):
     return x.sum()/years/1e6
 
-def Analysis(optimisation_x,suffix):
+def Lane(instance):
+    """Deficit power and deficit of one screening lane, for a worker pool"""
+
+    x, hydro, bio, context = instance
+    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliabilities(Solution(x, context), hydro=hydro[None], bio=bio[None], gas=np.zeros(context.intervals))
+
+    return Deficit_power[0], Deficit[0]
+
+def Analysis(optimisation_x,suffix,context,pool=None):
+    """Fill.Analysis(result.x, suffix, context, pool) with the pool of the optimisation, if any"""
+
     starttime = dt.datetime.now()
     print('Deficit fill starts at', starttime)
 
-    S = Solution(optimisation_x)
+    intervals, years, steps, baseload, allowance = (context.intervals, context.years, context.steps, context.baseload, context.allowance)
+    CHydro, CBio, Hydromax, Biomax, Gasmax = (context.CHydro, context.CBio, context.Hydromax, context.Biomax, context.Gasmax)
+
+    S = Solution(optimisation_x, context)
     
-    Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargeB1 = Reliability(S, hydro=baseload, bio=np.zeros(intervals), gas=np.zeros(intervals)) # Sj-EDE(t, j), MW
-    Max_deficit1 = np.reshape(Deficit1, (-1, 8760)).sum(axis=-1) # MWh per year
+    # Simulation lanes: (1) only baseload, (2) baseload and hydro, (3) baseload, hydro and bio
+    hydro = np.stack([baseload] + [np.ones(intervals) * CHydro.sum() * pow(10, 3)] * 2)
+    bio = np.stack([np.zeros(intervals)] * 2 + [np.ones(intervals) * CBio.sum() * pow(10, 3)])
+    if pool is not None:
+        # One lane per worker
+        Deficit_power, Deficit = zip(*pool.map(Lane, [(optimisation_x, hydro[k], bio[k], context) for k in range(len(hydro))]))
+    else:
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliabilities(S, hydro=hydro, bio=bio, gas=np.zeros(intervals)) # Sj-EDE(k, t), MW
+    Deficit_power1, Deficit_power2, Deficit_power3 = Deficit_power
+    Deficit1, Deficit2, Deficit3 = Deficit
+
+    Max_deficit1 = np.reshape(Deficit1, (-1, steps)).sum(axis=-1) # MWh per year
     PFlexible_Gas = Deficit_power1.max() * pow(10, -3) # GW
-    
-    Deficit_energy2, Deficit_power2, Deficit2, DischargePH2, DischargeB2 = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10, 3), bio=np.zeros(intervals), gas=np.zeros(intervals))
-    Max_deficit2 = np.reshape(Deficit2, (-1, 8760)).sum(axis=-1) # MWh per year
+    Max_deficit2 = np.reshape(Deficit2, (-1, steps)).sum(axis=-1) # MWh per year
     PBio_Gas = Deficit_power2.max() * pow(10, -3) # GW
-
-    Deficit_energy3, Deficit_power3, Deficit3, DischargePH3, DischargeB3 = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10, 3), bio=np.ones(intervals) * CBio.sum() * pow(10, 3), gas=np.zeros(intervals))
-    Max_deficit3 = np.reshape(Deficit3, (-1, 8760)).sum(axis=-1) # MWh per year
+    Max_deficit3 = np.reshape(Deficit3, (-1, steps)).sum(axis=-1) # MWh per year
     PGas = Deficit_power3.max() * pow(10, -3) # GW
     
     GHydro = (Max_deficit1 - Max_deficit2).max() / 0.8
@@ -122,17 +141,17 @@ def Analysis(optimisation_x,suffix):
         bio = np.zeros(intervals)
         gas = np.zeros(intervals)
         Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=bio, gas=gas)
-        h,b,g = fill_deficit(Deficit,hydro,bio,gas,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168)
+        h,b,g = fill_deficit(Deficit,hydro,bio,gas,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168,steps)
         Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
-        print("Hydro generation:", maxx(h))
+        print("Hydro generation:", maxx(h, steps))
         print("Remaining deficit:", Deficit.sum()/1e6)
         step = 1
         while Deficit.sum() > allowance*years and step < 50:
-            h,b,g = fill_deficit(Deficit,h,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168)
+            h,b,g = fill_deficit(Deficit,h,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168,steps)
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
             step += 1
-        print("Hydro generation max:", maxx(h))
-        print("Hydro generation mean:", mean(h))
+        print("Hydro generation max:", maxx(h, steps))
+        print("Hydro generation mean:", mean(h, years))
         print("Remaining deficit final:", Deficit.sum()/1e6)
     
     elif GGas == 0:
@@ -142,33 +161,33 @@ def Analysis(optimisation_x,suffix):
         bio = np.zeros(intervals)
         gas = np.zeros(intervals)
         Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=bio, gas=gas)
-        h,b,g = fill_deficit(Deficit,hydro,bio,gas,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168)
+        h,b,g = fill_deficit(Deficit,hydro,bio,gas,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168,steps)
         Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
         np.savetxt("Debug/Deficit.csv",Deficit)
-        print("Bio generation:", maxx(b))
+        print("Bio generation:", maxx(b, steps))
         print("Remaining deficit:", Deficit.sum()/1e6)
         step = 1
         while Deficit.sum() > allowance*years and step < 50:
-            h,b,g = fill_deficit(Deficit,h,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168)
+            h,b,g = fill_deficit(Deficit,h,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168,steps)
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
             step += 1
-        print("Bio generation max:", maxx(b))
-        print("Bio generation mean:", mean(b))
+        print("Bio generation max:", maxx(b, steps))
+        print("Bio generation mean:", mean(b, years))
         print("Remaining deficit final:", Deficit.sum()/1e6)
         if Deficit.sum() < allowance*years:
             hydro = baseload
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=b, gas=g)
-            h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168)
+            h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168,steps)
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
-            print("Hydro generation:", maxx(h))
+            print("Hydro generation:", maxx(h, steps))
             print("Remaining deficit:", Deficit.sum()/1e6)
             step = 1
             while Deficit.sum() > allowance*years and step < 50:
-                h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168)
+                h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168,steps)
                 Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
                 step += 1
-            print("Hydro generation max:", maxx(h))
-            print("Hydro generation mean:", mean(h))
+            print("Hydro generation max:", maxx(h, steps))
+            print("Hydro generation mean:", mean(h, years))
             print("Remaining deficit final:", Deficit.sum()/1e6)
         
     else:
@@ -178,47 +197,47 @@ def Analysis(optimisation_x,suffix):
         bio = np.ones(intervals) * blimit
         gas = np.zeros(intervals)
         Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=bio, gas=gas)
-        h,b,g = fill_deficit(Deficit,hydro,bio,gas,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,False,True,0.8,168)
+        h,b,g = fill_deficit(Deficit,hydro,bio,gas,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,False,True,0.8,168,steps)
         Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
-        print("Gas generation:", maxx(g))
+        print("Gas generation:", maxx(g, steps))
         print("Remaining deficit:", Deficit.sum()/1e6)
         step = 1
         while Deficit.sum() > allowance*years and step < 50:
-            h,b,g = fill_deficit(Deficit,h,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,False,True,0.8,168)
+            h,b,g = fill_deficit(Deficit,h,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,False,True,0.8,168,steps)
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
             step += 1
-        print("Gas generation max:", maxx(g))
-        print("Gas generation mean:", mean(g))
+        print("Gas generation max:", maxx(g, steps))
+        print("Gas generation mean:", mean(g, years))
         print("Remaining deficit final:", Deficit.sum()/1e6)
         if Deficit.sum() < allowance*years:
             bio = np.zeros(intervals)
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=bio, gas=g)
-            h,b,g = fill_deficit(Deficit,hydro,bio,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168)
+            h,b,g = fill_deficit(Deficit,hydro,bio,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168,steps)
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
-            print("Bio generation:", maxx(b))
+            print("Bio generation:", maxx(b, steps))
             print("Remaining deficit:", Deficit.sum()/1e6)
             step = 1
             while Deficit.sum() > allowance*years and step < 50:
-                h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168)
+                h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,False,True,False,0.8,168,steps)
                 Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
                 step += 1
-            print("Bio generation max:", maxx(b))
-            print("Bio generation mean:", mean(b))
+            print("Bio generation max:", maxx(b, steps))
+            print("Bio generation mean:", mean(b, years))
             print("Remaining deficit final:", Deficit.sum()/1e6)
         if Deficit.sum() < allowance*years:
             hydro = baseload
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=b, gas=g)
-            h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168)
+            h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168,steps)
             Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
-            print("Hydro generation:", maxx(h))
+            print("Hydro generation:", maxx(h, steps))
             print("Remaining deficit:", Deficit.sum()/1e6)
             step = 1
             while Deficit.sum() > allowance*years and step < 50:
-                h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168)
+                h,b,g = fill_deficit(Deficit,hydro,b,g,hlimit,blimit,sum(S.CGas)*1e3,Hydromax,Biomax,Gasmax,True,False,False,0.8,168,steps)
                 Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=h, bio=b, gas=g)
                 step += 1
-            print("Hydro generation max:", maxx(h))
-            print("Hydro generation mean:", mean(h))
+            print("Hydro generation max:", maxx(h, steps))
+            print("Hydro generation mean:", mean(h, years))
             print("Remaining deficit final:", Deficit.sum()/1e6)
 
     save(h,b,g,suffix)
@@ -227,11 +246,15 @@ def Analysis(optimisation_x,suffix):
     print('Deficit fill took', endtime - starttime)
 
     from Statistics import Information
-    Information(optimisation_x,h,b,g)
+    Information(optimisation_x,h,b,g,context)
 
     return True
 
 if __name__=='__main__':
-    suffix = "_APG_Full_HVAC_5_Hydrogen.csv"
+    from Input import Context
+    import Config
+
+    context = Context(**Config.Scenario(Config.Parse()))
+    suffix = context.suffix
     optimisation_x = np.genfromtxt('Results/Optimisation_resultx{}'.format(suffix), delimiter=',')
-    Analysis(optimisation_x,suffix)
\ No newline at end of file
+    Analysis(optimisation_x,suffix,context)
\ No newline at end of file
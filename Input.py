@@ -4,14 +4,9 @@
 # Correspondence: bin.lu@anu.edu.au
 
 import numpy as np
-from Optimisation import scenario, node, percapita, batteryScenario, gasScenario
-######### DEBUG ##########
-""" scenario = 'HVAC'
-node = 'APG_MY_Isolated'
-percapita = 5
-batteryScenario = True
-gasScenario = True """
-#########################
+from Cache import Load
+from Config import Suffix
+from Representative import Select
 
 ###### NODAL LISTS ######
 Nodel = np.array(['ME', 'SB', 'TE', 'PA', 'SE', 'PE', 'JO', 'KT', 'KD', 'SW', 'TH', 'IN', 'PH'])
@@ -19,173 +14,258 @@ PVl =   np.array(['ME']*1 + ['SB']*2 + ['TE']*1 + ['PA']*1 + ['SE']*1 + ['PE']*2
 pv_ub_np = np.array([365.] + [887., 887.] + [257.] + [1071.] + [260.] + [284., 284.] + [1070.] + [163.] + [103.,103.] + [627., 627., 627.])
 phes_ub_np = np.array([55.] + [1200.] + [368.] + [552.] + [13.] + [1268.] + [2.] + [942.] + [255.] + [2000.] + [0.] + [0.] + [0.])
 #Windl = np.array(['ME']*1 + ['SB']*1 + ['TE']*1 + ['PA']*1 + ['SE']*1 + ['PE']*1 + ['JO']*1 + ['KT']*1 + ['KD']*1 + ['SW']*1)
-Interl = np.array(['TH']*1 + ['IN']*1 + ['PH']*1) if node=='APG_Full' else np.array([]) # Add external interconnections if ASEAN Power Grid scenario
-resolution = 1
-
-###### DATA IMPORTS ######
-MLoad = np.genfromtxt('Data/electricity{}.csv'.format(percapita), delimiter=',', skip_header=1, usecols=range(4, 4+len(Nodel))) # EOLoad(t, j), MW
-TSPV = np.genfromtxt('Data/pv.csv', delimiter=',', skip_header=1, usecols=range(4, 4+len(PVl))) # TSPV(t, i), MW
-#TSWind = np.genfromtxt('Data/wind.csv', delimiter=',', skip_header=1, usecols=range(4, 4+len(Windl))) # TSWind(t, i), MW
-
-assets = np.genfromtxt('Data/assets.csv', dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(np.float)
-CHydro, CBio = [assets[:, x] * pow(10, -3) for x in range(assets.shape[1])] # CHydro(j), MW to GW
-constraints = np.genfromtxt('Data/constraints.csv', dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(np.float)
-EHydro, EBio = [constraints[:, x] for x in range(assets.shape[1])] # GWh per year
-CBaseload = np.array([0, 1, 0.26, 0.01, 0, 0.01, 0, 0.01, 0, 0.78, 0, 0, 0]) * EHydro / 8760 # 24/7, GW # Run-of-river percentage
-CPeak = CHydro + CBio - CBaseload # GW
-
-baseload = np.ones(MLoad.shape[0]) * CBaseload.sum() * 1000 # GW to MW
-
-###### CONSTRAINTS ######
-# Energy constraints
-Hydromax = EHydro.sum() * pow(10,3) # GWh to MWh per year
-Biomax = EBio.sum() * pow(10,3) # GWh to MWh per year
-
-# Transmission constraints
-externalImports = 0.05 if node=='APG_Full' else 0
-CDC9max, CDC10max, CDC11max = 3 * [externalImports * MLoad.sum() / MLoad.shape[0] / 1000] # 5%: External interconnections: THKD, INSE, PHSB, MW to GW
-
-###### TRANSMISSION LOSSES ######
-if scenario=='HVDC':
-    # HVDC backbone scenario
-    dc_flags = np.array([True,True,True,True,True,True,True,True,True,True,True,True])
-    
-elif scenario=='HVAC':
-    # HVAC backbone scenario
-    dc_flags = np.array([False,False,False,False,False,False,False,False,True,True,True,True])
-    
-TLoss = []
 TDistances = [135, 165, 90, 170, 175, 675, 135, 135, 935, 200, 260, 450] # ['KDPE', 'TEPA', 'SEME', 'MEJO', 'PESE', 'SBSW', 'KTTE', 'PASE', 'JOSW', 'THKD', 'INSE', 'PHSB']
-for i in range(0,len(dc_flags)):
-    TLoss.append(TDistances[i]*0.03) if dc_flags[i] else TLoss.append(TDistances[i]*0.07)
-TLoss = np.array(TLoss)* pow(10, -3)
-
-###### STORAGE SYSTEM CONSTANTS ######
-efficiencyPH = 0.8
-efficiencyB = 0.9
-
-###### COST FACTORS ######
-if scenario=='HVDC':
-    factor = np.genfromtxt('Data/factor.csv', delimiter=',', usecols=1)
-else:
-    factor = np.genfromtxt('Data/factor_hvac.csv', delimiter=',', usecols=1)
-
-###### SIMULATION PERIOD ######
-firstyear, finalyear, timestep = (2012, 2021, 1)
-
-###### SCENARIO ADJUSTMENTS #######
-# Node values
-if 'APG_Full' == node:
-    coverage = Nodel
-
-else:
-    if 'APG_PMY_Only' == node:
-        coverage = np.array(['JO', 'KD', 'KT', 'ME', 'PA', 'PE', 'SE', 'TE'])
-    elif 'APG_BMY_Only' == node:
-        coverage = np.array(['SB', 'SW'])
-    elif 'APG_MY_Isolated' == node:
-        coverage = np.array(['JO', 'KD', 'KT', 'ME', 'PA', 'PE', 'SB', 'SW', 'SE', 'TE'])
-    else:
-        coverage = np.array([node])
-
-    MLoad = MLoad[:, np.where(np.in1d(Nodel, coverage)==True)[0]]
-    TSPV = TSPV[:, np.where(np.in1d(PVl, coverage)==True)[0]]
-    #TSWind = TSWind[:, np.where(np.in1d(Windl, coverage)==True)[0]]
-
-    CBaseload = CBaseload[np.where(np.in1d(Nodel, coverage)==True)[0]]
-    CHydro = CHydro[np.where(np.in1d(Nodel, coverage)==True)[0]]
-    CBio = CBio[np.where(np.in1d(Nodel, coverage)==True)[0]]
-    CPeak = CHydro + CBio - CBaseload # GW
-
-    EHydro, EBio = [x[np.where(np.in1d(Nodel, coverage)==True)[0]] for x in (EHydro, EBio)]
-
-    Hydromax = EHydro.sum() * pow(10,3) # GWh to MWh per year
-    Biomax = EBio.sum() * pow(10,3) # GWh to MWh per year
-
-    baseload = np.ones(MLoad.shape[0]) * CBaseload.sum() * 1000 # GW to MW
-
-    pv_ub_np = pv_ub_np[np.where(np.in1d(PVl, coverage)==True)[0]]
-    phes_ub_np = phes_ub_np[np.where(np.in1d(Nodel, coverage)==True)[0]]
-
-    Nodel, PVl, Interl = [x[np.where(np.in1d(x, coverage)==True)[0]] for x in (Nodel, PVl, Interl)]
-    
-#    Nodel, PVl, Windl, Interl = [x[np.where(np.in1d(x, coverage)==True)[0]] for x in (Nodel, PVl, Windl, Interl)]
-
-# Scenario values
-if scenario == 'HVAC':
-    factor = np.genfromtxt('Data/factor_hvac.csv', delimiter=',', usecols=1)
-
-###### DECISION VARIABLE LIST INDEXES ######
-intervals, nodes = MLoad.shape
-years = int(resolution * intervals / 8760)
-pzones = TSPV.shape[1] # Solar PV and wind sites
-# wzones = TSWind.shape[1]
-# pidx, widx, phidx, bidx = (pzones, pzones + wzones, pzones + wzones + nodes, pzones + wzones + 2*nodes) # Index of solar PV (sites), wind (sites), pumped hydro power (service areas), and battery power (service areas)
-pidx, phidx, bidx = (pzones, pzones + nodes, pzones + 2*nodes) # Index of solar PV (sites), wind (sites), pumped hydro power (service areas), and battery power (service areas)
-inters = len(Interl) # Number of external interconnections
-iidx = bidx + 2 + inters # Index of external interconnections, noting pumped hydro energy (network) and battery energy (network) decision variables after the index of battery power
-gidx = iidx + nodes # Index of hydrogen (service areas)
-
-###### NETWORK CONSTRAINTS ######
-energy = (MLoad).sum() * pow(10, -9) * resolution / years # PWh p.a.
-contingency_ph = list(0.25 * (MLoad).max(axis=0) * pow(10, -3)) # MW to GW
-contingency_b = list(0.1 * (MLoad).max(axis=0) * pow(10, -3)) # MW to GW
-#manage = 0 # weeks
-#allowance = MLoad.sum(axis=1).max() * 0.05 * manage * 168 * efficiencyPH # MWh
-allowance = min(0.00002*np.reshape(MLoad.sum(axis=1), (-1, 8760)).sum(axis=-1)) # Allowable annual deficit of 0.002%, MWh
-
-GBaseload = np.tile(CBaseload, (intervals, 1)) * pow(10, 3) # GW to MW
-Gasmax = energy * 2 * pow(10,9) # MWh
-
-###### DECISION VARIABLE UPPER BOUNDS ######
-pv_ub = [x for x in pv_ub_np]
-phes_ub = [x for x in phes_ub_np]
-battery_ub = [1000.] * (nodes - inters) + inters * [0] if batteryScenario == True else nodes * [0]
-phes_s_ub = [10000.]
-battery_s_ub = [10000.] if batteryScenario == True else [0]
-inter_ub = [500.] * inters if node == 'APG_Full' else inters * [0]
-gas_ub = [50.] * (nodes - inters) + inters * [0] if gasScenario == True else nodes * [0]
+Lines = [('PE', 'KD'), ('PA', 'TE'), ('ME', 'SE'), ('ME', 'JO'), ('PE', 'SE'), ('SW', 'SB'), ('KT', 'TE'), ('PA', 'SE'), ('SW', 'JO'), ('TH', 'KD'), ('SE', 'IN'), ('PH', 'SB')] # Nodes of the lines of TDistances, positive flow from the first to the second
+
+raw, contexts = ({}, {}) # Raw data and scenario contexts already loaded by this process
+
+def Raw(path, **kwargs):
+    """Raw data shared by all scenario contexts of a process, loaded once"""
+
+    key = (path, repr(sorted(kwargs.items())))
+    if key not in raw:
+        raw[key] = Load(path, **kwargs)
+
+    return raw[key]
+
+class ScenarioContext:
+    """All modelling input of one scenario: context = ScenarioContext(node, scenario, percapita, battery, gas).
+    A coarse context for multi-fidelity optimisation averages the time series over resolution hours, keeps the first
+    span years and/or simulates the medoids of the days clustered into days representative days; its decision
+    variables and bounds are those of the hourly context"""
+
+    def __init__(self, node, scenario, percapita, battery, gas, resolution=1, span=None, days=None):
+        self.node, self.scenario, self.percapita = (node, scenario, percapita)
+        self.batteryScenario, self.gasScenario = (battery, gas)
+        if 8760 % resolution != 0:
+            raise ValueError('resolution of {} hours does not divide a year'.format(resolution))
+
+        ###### NODAL LISTS ######
+        self.Nodel, self.PVl = (Nodel, PVl)
+        self.Interl = np.array(['TH']*1 + ['IN']*1 + ['PH']*1) if node=='APG_Full' else np.array([]) # Add external interconnections if ASEAN Power Grid scenario
+        self.resolution = resolution # Hours per time step
+        self.steps = 8760 // resolution # Time steps per year
+        self.span, self.days = (span, days)
+
+        ###### DATA IMPORTS ######
+        self.MLoad = Raw('Data/electricity{}.csv'.format(percapita), delimiter=',', skip_header=1, usecols=range(4, 4+len(Nodel))) # EOLoad(t, j), MW
+        self.TSPV = Raw('Data/pv.csv', delimiter=',', skip_header=1, usecols=range(4, 4+len(PVl))) # TSPV(t, i), MW
+        #self.TSWind = Raw('Data/wind.csv', delimiter=',', skip_header=1, usecols=range(4, 4+len(Windl))) # TSWind(t, i), MW
+
+        assets = Raw('Data/assets.csv', dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(np.float)
+        self.CHydro, self.CBio = [assets[:, x] * pow(10, -3) for x in range(assets.shape[1])] # CHydro(j), MW to GW
+        constraints = Raw('Data/constraints.csv', dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(np.float)
+        self.EHydro, self.EBio = [constraints[:, x] for x in range(assets.shape[1])] # GWh per year
+        self.CBaseload = np.array([0, 1, 0.26, 0.01, 0, 0.01, 0, 0.01, 0, 0.78, 0, 0, 0]) * self.EHydro / 8760 # 24/7, GW # Run-of-river percentage
+
+        ###### CONSTRAINTS ######
+        # Transmission constraints
+        externalImports = 0.05 if node=='APG_Full' else 0
+        self.CDC9max, self.CDC10max, self.CDC11max = 3 * [externalImports * self.MLoad.sum() / self.MLoad.shape[0] / 1000] # 5%: External interconnections: THKD, INSE, PHSB, MW to GW
+
+        ###### TRANSMISSION LOSSES ######
+        if scenario=='HVDC':
+            # HVDC backbone scenario
+            self.dc_flags = np.array([True,True,True,True,True,True,True,True,True,True,True,True])
+
+        elif scenario=='HVAC':
+            # HVAC backbone scenario
+            self.dc_flags = np.array([False,False,False,False,False,False,False,False,True,True,True,True])
+
+        self.TDistances, self.Lines = (TDistances, Lines)
+        self.TLoss = np.array([TDistances[i]*0.03 if self.dc_flags[i] else TDistances[i]*0.07 for i in range(0,len(self.dc_flags))]) * pow(10, -3)
+
+        ###### STORAGE SYSTEM CONSTANTS ######
+        self.efficiencyPH = 0.8
+        self.efficiencyB = 0.9
+
+        ###### COST FACTORS ######
+        self.factor = Raw('Data/factor.csv', delimiter=',', usecols=1) if scenario=='HVDC' else Raw('Data/factor_hvac.csv', delimiter=',', usecols=1)
+
+        ###### SIMULATION PERIOD ######
+        self.firstyear, self.finalyear, self.timestep = (2012, 2021, 1)
+
+        ###### SCENARIO ADJUSTMENTS #######
+        # Node values
+        if 'APG_Full' == node:
+            self.coverage = Nodel
+            self.pv_ub_np, self.phes_ub_np = (pv_ub_np, phes_ub_np)
+
+        else:
+            if 'APG_PMY_Only' == node:
+                self.coverage = np.array(['JO', 'KD', 'KT', 'ME', 'PA', 'PE', 'SE', 'TE'])
+            elif 'APG_BMY_Only' == node:
+                self.coverage = np.array(['SB', 'SW'])
+            elif 'APG_MY_Isolated' == node:
+                self.coverage = np.array(['JO', 'KD', 'KT', 'ME', 'PA', 'PE', 'SB', 'SW', 'SE', 'TE'])
+            else:
+                self.coverage = np.array([node])
+
+            nidx, pvidx = (np.where(np.in1d(Nodel, self.coverage)==True)[0], np.where(np.in1d(PVl, self.coverage)==True)[0])
+            self.MLoad = self.MLoad[:, nidx]
+            self.TSPV = self.TSPV[:, pvidx]
+            #self.TSWind = self.TSWind[:, np.where(np.in1d(Windl, self.coverage)==True)[0]]
+
+            self.CBaseload, self.CHydro, self.CBio, self.EHydro, self.EBio = [x[nidx] for x in (self.CBaseload, self.CHydro, self.CBio, self.EHydro, self.EBio)]
+
+            self.pv_ub_np = pv_ub_np[pvidx]
+            self.phes_ub_np = phes_ub_np[nidx]
+
+            self.Nodel, self.PVl, self.Interl = [x[np.where(np.in1d(x, self.coverage)==True)[0]] for x in (self.Nodel, self.PVl, self.Interl)]
+
+#            Nodel, PVl, Windl, Interl = [x[np.where(np.in1d(x, coverage)==True)[0]] for x in (Nodel, PVl, Windl, Interl)]
+
+        ###### TIME RESOLUTION ######
+        hourly = self.MLoad # Contingency bounds from the hourly demand, so every fidelity has the same decision variables
+        if span is not None:
+            self.MLoad, self.TSPV = [x[: span * 8760] for x in (self.MLoad, self.TSPV)]
+        if resolution > 1:
+            # Block means: the energy of a step, mean power x resolution, is that of its hours
+            self.MLoad, self.TSPV = [x.reshape(-1, resolution, x.shape[1]).mean(axis=1) for x in (self.MLoad, self.TSPV)]
+
+        self.CPeak = self.CHydro + self.CBio - self.CBaseload # GW
+        self.baseload = np.ones(self.MLoad.shape[0]) * self.CBaseload.sum() * 1000 # GW to MW
+
+        # Energy constraints
+        self.Hydromax = self.EHydro.sum() * pow(10,3) # GWh to MWh per year
+        self.Biomax = self.EBio.sum() * pow(10,3) # GWh to MWh per year
+
+        ###### DECISION VARIABLE LIST INDEXES ######
+        self.intervals, self.nodes = self.MLoad.shape
+        self.years = int(self.resolution * self.intervals / 8760)
+        self.pzones = self.TSPV.shape[1] # Solar PV and wind sites
+        # wzones = TSWind.shape[1]
+        # pidx, widx, phidx, bidx = (pzones, pzones + wzones, pzones + wzones + nodes, pzones + wzones + 2*nodes) # Index of solar PV (sites), wind (sites), pumped hydro power (service areas), and battery power (service areas)
+        self.pidx, self.phidx, self.bidx = (self.pzones, self.pzones + self.nodes, self.pzones + 2*self.nodes) # Index of solar PV (sites), wind (sites), pumped hydro power (service areas), and battery power (service areas)
+        self.inters = len(self.Interl) # Number of external interconnections
+        self.iidx = self.bidx + 2 + self.inters # Index of external interconnections, noting pumped hydro energy (network) and battery energy (network) decision variables after the index of battery power
+        self.gidx = self.iidx + self.nodes # Index of hydrogen (service areas)
+
+        ###### NETWORK CONSTRAINTS ######
+        self.energy = (self.MLoad).sum() * pow(10, -9) * self.resolution / self.years # PWh p.a.
+        self.contingency_ph = list(0.25 * (hourly).max(axis=0) * pow(10, -3)) # MW to GW
+        self.contingency_b = list(0.1 * (hourly).max(axis=0) * pow(10, -3)) # MW to GW
+        #manage = 0 # weeks
+        #allowance = MLoad.sum(axis=1).max() * 0.05 * manage * 168 * efficiencyPH # MWh
+        self.allowance = min(0.00002*np.reshape(self.MLoad.sum(axis=1), (-1, self.steps)).sum(axis=-1)) * self.resolution # Allowable annual deficit of 0.002%, MWh
+
+        ###### REPRESENTATIVE DAYS ######
+        # Energy and allowance above are those of the full chronology; sums over the representative days are weighted
+        self.weights = None # Days represented by each interval; None for a chronological context
+        if days is not None:
+            index, self.weights = Select(self.MLoad, self.TSPV, days, 24 // resolution)
+            self.MLoad, self.TSPV, self.baseload = (self.MLoad[index], self.TSPV[index], self.baseload[index])
+            self.intervals = len(index)
+
+        self.GBaseload = np.tile(self.CBaseload, (self.intervals, 1)) * pow(10, 3) # GW to MW
+        self.Gasmax = self.energy * 2 * pow(10,9) # MWh
+
+        ###### DECISION VARIABLE UPPER BOUNDS ######
+        nodes, inters = (self.nodes, self.inters)
+        self.pv_ub = [x for x in self.pv_ub_np]
+        self.phes_ub = [x for x in self.phes_ub_np]
+        self.battery_ub = [1000.] * (nodes - inters) + inters * [0] if battery == True else nodes * [0]
+        self.phes_s_ub = [10000.]
+        self.battery_s_ub = [10000.] if battery == True else [0]
+        self.inter_ub = [500.] * inters if node == 'APG_Full' else inters * [0]
+        self.gas_ub = [50.] * (nodes - inters) + inters * [0] if gas == True else nodes * [0]
+
+        ###### DECISION VARIABLE BOUNDS ######
+#        lb = [0.]       * pzones + [0.]     * wzones + contingency_ph   + contingency_b     + [0.]      + [0.]     + [0.]    * inters + [0.] * nodes
+#        ub = [10000.]   * pzones + [300]    * wzones + [10000.] * nodes + [10000.] * nodes  + [100000.] + [100000] + [1000.] * inters + [50.] * nodes
+        self.lb = [0.]       * self.pzones + self.contingency_ph   + self.contingency_b                 + [0.]      + [0.]      + [0.]    * inters + ([0.] * (nodes - inters) + inters * [0])
+        self.ub = self.pv_ub + self.phes_ub + self.battery_ub + self.phes_s_ub + self.battery_s_ub + self.inter_ub + self.gas_ub
+
+        # Free decision variables, searched by the optimiser; the others have lb == ub and are fixed at that value
+        self.free = np.flatnonzero(np.array(self.lb) != np.array(self.ub))
+        self.fixed = np.array(self.lb, dtype=np.float64)
+
+        self.suffix = Suffix(self.config()) # Results file name suffix
+
+    def expand(self, z):
+        """Full decision vectors x (..., N) from the free variables z (..., free) searched by the optimiser"""
+
+        z = np.asarray(z)
+        x = np.empty(z.shape[:-1] + self.fixed.shape)
+        x[...] = self.fixed
+        x[..., self.free] = z
+
+        return x
+
+    def reduce(self, x):
+        """Free variables of full decision vectors x (..., N)"""
+        return np.asarray(x)[..., self.free]
+
+    def config(self):
+        config = {'node': self.node, 'scenario': self.scenario, 'percapita': self.percapita, 'battery': self.batteryScenario, 'gas': self.gasScenario}
+        if self.resolution != 1 or self.span is not None or self.days is not None: # Hourly contexts keep their configuration and results files
+            config.update(resolution=self.resolution, span=self.span, days=self.days)
+        return config
+
+    def coarse(self, resolution=1, span=None, days=None):
+        """The context of this scenario at a coarser fidelity"""
+        return Context(self.node, self.scenario, self.percapita, self.batteryScenario, self.gasScenario, resolution, span, days)
+
+    def __reduce__(self):
+        """Pickled as its configuration, so a worker finds it in (or adds it to) its own context cache"""
+        return (Context, tuple(self.config().values()))
+
+    def __repr__(self):
+        return 'ScenarioContext({})'.format(', '.join(repr(value) for value in self.config().values()))
+
+def Context(node, scenario, percapita, battery, gas, resolution=1, span=None, days=None):
+    """context = Input.Context(...) returns the cached ScenarioContext of this process, building it on first use"""
+
+    key = (node, scenario, percapita, battery, gas, resolution, span, days)
+    if key not in contexts:
+        contexts[key] = ScenarioContext(*key)
+
+    return contexts[key]
 
 class Solution:
     """A candidate solution of decision variables CPV(i), CWind(i), CPHP(j), S-CPHS(j)"""
 
-    def __init__(self, x):
+    def __init__(self, x, context):
+        C = context
         self.x = x
-        self.MLoad = MLoad
-        self.intervals, self.nodes = (intervals, nodes)
-        self.resolution = resolution
-        self.baseload = baseload
+        self.context = context
+        self.MLoad = C.MLoad
+        self.intervals, self.nodes = (C.intervals, C.nodes)
+        self.resolution = C.resolution
+        self.baseload = C.baseload
 
-        self.CPV = list(x[: pidx]) # CPV(i), GW
+        self.CPV = list(x[: C.pidx]) # CPV(i), GW
 #        self.CWind = list(x[pidx: widx]) # CWind(i), GW
-        self.GPV = TSPV * np.tile(self.CPV, (intervals, 1)) * pow(10, 3) # GPV(i, t), GW to MW
+        self.GPV = C.TSPV * np.tile(self.CPV, (C.intervals, 1)) * pow(10, 3) # GPV(i, t), GW to MW
 #        self.GWind = TSWind * np.tile(self.CWind, (intervals, 1)) * pow(10, 3) # GWind(i, t), GW to MW
 
 #        self.CPHP = list(x[widx: phidx]) # CPHP(j), GW
-        self.CPHP = list(x[pidx: phidx]) # CPHP(j), GW
-        self.CBP = list(x[phidx: bidx])
-        self.CPHS = x[bidx] # S-CPHS(j), GWh
-        self.CBS = x[bidx+1] 
-        self.efficiencyPH = efficiencyPH
-        self.efficiencyB = efficiencyB
+        self.CPHP = list(x[C.pidx: C.phidx]) # CPHP(j), GW
+        self.CBP = list(x[C.phidx: C.bidx])
+        self.CPHS = x[C.bidx] # S-CPHS(j), GWh
+        self.CBS = x[C.bidx+1]
+        self.efficiencyPH = C.efficiencyPH
+        self.efficiencyB = C.efficiencyB
+
+        self.CInter = list(x[C.bidx+2: C.iidx]) if C.node == 'APG_Full' else len(C.Interl)*[0] #CInter(j), GW
+        self.GInter = np.tile(self.CInter, (C.intervals, 1)) * pow(10,3) # GInter(j, t), GW to MW
 
-        self.CInter = list(x[bidx+2: iidx]) if node == 'APG_Full' else len(Interl)*[0] #CInter(j), GW
-        self.GInter = np.tile(self.CInter, (intervals, 1)) * pow(10,3) # GInter(j, t), GW to MW
+        self.Netload = C.MLoad.sum(axis=1) - self.GPV.sum(axis=1) - self.GInter.sum(axis=1) # - self.GWind.sum(axis=1); Net load before flexible supply, MW
 
-        self.CGas = list(x[iidx: ]) # GW
+        self.CGas = list(x[C.iidx: ]) # GW
 
-        self.Nodel, self.PVl, self.Interl = (Nodel, PVl, Interl)
+        self.Nodel, self.PVl, self.Interl = (C.Nodel, C.PVl, C.Interl)
 #        self.Windl = Windl
-        self.node = node
-        self.scenario = scenario
-        self.allowance = allowance
-        self.coverage = coverage
-        self.TLoss = TLoss
+        self.node = C.node
+        self.scenario = C.scenario
+        self.allowance = C.allowance
+        self.coverage = C.coverage
+        self.TLoss = C.TLoss
 
-        self.CBaseload, self.CPeak = (CBaseload, CPeak)
-        self.CHydro = CHydro # GW
-        self.CBio = CBio # GW
+        self.CBaseload, self.CPeak = (C.CBaseload, C.CPeak)
+        self.CHydro = C.CHydro # GW
+        self.CBio = C.CBio # GW
 
     def __repr__(self):
-        """S = Solution(list(np.ones(64))) >> print(S)"""
-        return 'Solution({})'.format(self.x)
\ No newline at end of file
+        """S = Solution(list(np.ones(64)), context) >> print(S)"""
+        return 'Solution({})'.format(self.x)
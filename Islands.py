@@ -0,0 +1,105 @@
+# Island-model differential evolution: one sub-population per worker process, exchanging their best members
+# Licensed under the MIT Licence
+
+from scipy.optimize import OptimizeResult
+from Telemetry import Telemetry, Stagnation, Path
+from types import SimpleNamespace
+from functools import partial
+import numpy as np
+import Checkpoint
+import Record
+import queue
+import Seed
+
+golden = (np.sqrt(5) - 1) / 2
+
+def Settings(k, islands, mutation, recombination):
+    """Mutation and recombination of island k: evenly spread over the -m range, and over the -r range in a scrambled
+    order so that the islands cover the combinations of both"""
+
+    m = mutation[0] + (mutation[1] - mutation[0]) * (k / (islands - 1) if islands > 1 else 0.5)
+    r = recombination[0] + (recombination[1] - recombination[0]) * ((k * golden) % 1)
+
+    return m, r
+
+class Migration:
+    """Generation callback of island k: every interval generations the best member goes to the next island of the
+    ring, and the migrants received replace the worst members. Neither side waits for the other"""
+
+    def __init__(self, k, queues, interval):
+        self.k, self.queues, self.interval = (k, queues, interval)
+
+    def __call__(self, solver, nit):
+        if nit % self.interval == 0:
+            self.queues[(self.k + 1) % len(self.queues)].put((solver.x, solver.population_energies[0]))
+
+        while True:
+            try:
+                x, energy = self.queues[self.k].get_nowait()
+            except queue.Empty:
+                break
+            worst = np.argmax(solver.population_energies)
+            if energy < solver.population_energies[worst]:
+                solver.population[worst] = solver._unscale_parameters(np.asarray(x))
+                solver.population_energies[worst] = energy
+                solver._promote_lowest_energy()
+
+        return False
+
+def Island(k, context, queues, options):
+    """Run island k of the len(queues) islands to the end in this worker; returns its best x, objective value and
+    generations. Each island has its own checkpoint and telemetry files and numbers its own generations in the log"""
+
+    from Objective import Free
+
+    mutation, recombination = Settings(k, len(queues), options['mutation'], options['recombination'])
+    lb, ub = (context.reduce(context.lb), context.reduce(context.ub))
+
+    # The island numbers its own generations; the pool's shared counter is restored for the stages after island mode
+    shared, generation = (Record.generation, SimpleNamespace(value=0))
+    Record.Configure(Record.policy, generation)
+    try:
+        checkpoint = Checkpoint.Path(context.suffix).replace('.pkl', '_island{}.pkl'.format(k))
+        state = Checkpoint.Load(checkpoint) if options['resume'] else None
+        if state is not None:
+            generation.value = state['nit']
+
+        init = Seed.Population(context, options['popsize']) if options['warm'] and state is None else None
+        init = context.reduce(init) if init is not None else 'latinhypercube'
+
+        def advance(solver, nit):
+            generation.value += 1
+
+        telemetry = Telemetry(context, rules=options['rules'], path=Path(context.suffix.replace('.csv', '_island{}.csv'.format(k))))
+
+        # One core per island and immediate updating, so no generation waits for a slower candidate
+        result = Checkpoint.Solve(checkpoint, state, [advance, Migration(k, queues, options['migration']), telemetry],
+                                  func=Free, bounds=list(zip(lb, ub)), tol=0, init=init, maxiter=options['maxiter'], popsize=options['popsize'],
+                                  mutation=mutation, recombination=recombination, disp=False, polish=False, updating='immediate', args=(context,),
+                                  seed=np.random.RandomState()) # Fresh entropy: forked workers share the global random state
+
+        print('Island {}: mutation {:.2f}, recombination {:.2f}, f(x)= {} after {} generations'.format(k, mutation, recombination, result.fun, result.nit), flush=True)
+    finally:
+        Record.Flush() # The island's records and summaries under its own generations
+        Record.Configure(Record.policy, shared)
+
+    return result.x, result.fun, result.nit
+
+def Run(pool, context, options):
+    """Island-model optimisation on all workers of the pool; returns the best solution of all islands, like the other
+    optimisers in the free decision variables"""
+
+    islands = pool.processes
+    with pool.mp.Manager() as manager:
+        queues = [manager.Queue() for k in range(islands)]
+        results = pool.map(partial(Island, context=context, queues=queues, options=options), range(islands))
+
+    x, fun, nit = min(results, key=lambda result: result[1])
+
+    return OptimizeResult(x=x, fun=fun, nit=max(result[2] for result in results), population=np.array([result[0] for result in results]))
+
+def Options(args):
+    """Island settings from the parsed command line"""
+
+    return {'maxiter': args.i, 'popsize': args.p, 'mutation': args.m, 'recombination': args.r, 'migration': args.M,
+            'resume': args.resume, 'warm': args.warm, 'rules': [Stagnation(args.S, args.E, args.F)] if args.S > 0 else []}
@@ -0,0 +1,90 @@
+# Memoising cache of objective values for repeated or near-identical candidates
+# Licensed under the MIT Licence
+
+from multiprocessing.managers import BaseManager
+from collections import OrderedDict
+from multiprocessing import util
+import numpy as np
+import os
+
+mode = os.environ.get('FIRM_MEMO', '') # '' (off), worker (one cache per process) or shared (one cache for the pool)
+size = int(os.environ.get('FIRM_MEMO_SIZE', 65536)) # Entries per cache
+grid = float(os.environ.get('FIRM_MEMO_GRID', 0.001)) # GW and GWh, i.e. 1 MW and 1 MWh
+tables = {} # Caches of this process by results suffix
+shared = None # Proxy of the pool's shared cache, set by the WorkerPool initializer
+registered = None # Process that has registered Report to run at its exit
+
+class LRU:
+    """Bounded least-recently-used map of quantised decision vectors to (objective, penalties and LCOE), with hit and
+    miss counters. Lookups and stores take lists, so a shared cache costs one round trip per batch"""
+
+    def __init__(self, size):
+        self.size = size
+        self.table = OrderedDict()
+        self.hits, self.misses = (0, 0)
+        self.pid = os.getpid()
+
+    def lookup(self, keys):
+        values = []
+        for key in keys:
+            value = self.table.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.table.move_to_end(key)
+            values.append(value)
+        return values
+
+    def store(self, keys, values):
+        for key, value in zip(keys, values):
+            self.table[key] = value
+            self.table.move_to_end(key)
+            if len(self.table) > self.size:
+                self.table.popitem(last=False)
+
+    def stats(self):
+        return self.hits, self.misses, len(self.table)
+
+class Manager(BaseManager):
+    """Server process holding the shared cache of a WorkerPool"""
+
+Manager.register('LRU', LRU)
+
+def Keys(X, suffix=''):
+    """Cache keys of the (k, N) candidates X: the decision vectors rounded to the grid, and the results suffix so that
+    the fidelities of a scenario sharing one cache do not mix"""
+    return [suffix.encode() + row.tobytes() for row in np.round(np.atleast_2d(X) / grid).astype(np.int64)]
+
+def Configure(table):
+    """Use the shared cache of the pool in this worker (WorkerPool initializer)"""
+
+    global shared
+    shared = table
+
+def Table(suffix):
+    """memo = Memo.Table(context.suffix); None unless FIRM_MEMO is set"""
+
+    global registered
+    if shared is not None:
+        return shared
+    if mode != 'worker':
+        return None
+
+    if registered != os.getpid():
+        util.Finalize(None, Report, exitpriority=5)
+        registered = os.getpid()
+
+    table = tables.get(suffix)
+    if table is None or table.pid != os.getpid(): # A forked worker starts with an empty cache
+        table = tables[suffix] = LRU(size)
+
+    return table
+
+def Report():
+    """Print the hits and misses of the caches of this process"""
+
+    for suffix, table in tables.items():
+        if table.pid == os.getpid() and table.hits + table.misses > 0:
+            hits, misses, entries = table.stats()
+            print('Memo {}: {} hits, {} misses ({:.1%} hits), {} entries'.format(os.getpid(), hits, misses, hits / (hits + misses), entries), flush=True)
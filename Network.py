@@ -5,8 +5,117 @@
 
 import numpy as np
 
+aggregations = {} # Aggregation matrices of the scenario contexts of this process, by results suffix
+operators = {} # Flow operators of the coverage sets of this process, by nodes and lines
+
+def Share(capacity):
+    """Share of each node in a capacity (nodes), zeros without any"""
+
+    capacity = np.asarray(capacity, dtype=np.float64)
+    return capacity / capacity.sum() if capacity.sum() > 0 else np.zeros(len(capacity))
+
+class Aggregation:
+    """Site-to-node matrices and fixed node shares of a scenario, built once per process: PV (sites, nodes) and Inter
+    (interconnections, nodes) sum the sites of each node, hydro and bio are the shares of the existing capacity and
+    deficit (t, nodes) the share of each node in the demand. buffer holds the nodal imports of a call"""
+
+    def __init__(self, context):
+        C = context
+        self.PV = (C.PVl[:, None] == C.Nodel[None, :]).astype(np.float64)
+        self.Inter = (C.Interl[:, None] == C.Nodel[None, :]).astype(np.float64) if C.node == 'APG_Full' else None
+        self.hydro, self.bio = (Share(C.CHydro), Share(C.CBio))
+        self.deficit = C.MLoad / C.MLoad.sum(axis=1)[:, None]
+        self.buffer, self.scratch = (np.empty((C.intervals, C.nodes)), np.empty((C.intervals, C.nodes)))
+
+def Aggregate(context):
+    """The Aggregation of a scenario context, built on first use"""
+
+    aggregation = aggregations.get(context.suffix)
+    if aggregation is None:
+        aggregation = aggregations[context.suffix] = Aggregation(context)
+
+    return aggregation
+
+def Incidence(nodes, lines):
+    """(nodes, lines) node-line incidence matrix: -1 at the node a line leaves and +1 at the node it enters. A line with
+    a node outside nodes has an empty column"""
+
+    index = {node: j for j, node in enumerate(nodes)}
+    A = np.zeros((len(nodes), len(lines)))
+    for k, (start, end) in enumerate(lines):
+        if start in index and end in index:
+            A[index[start], k], A[index[end], k] = (-1, 1)
+
+    return A
+
+def Operator(nodes, lines):
+    """P, A = Operator(nodes, lines): the (nodes, lines) operator P taking the nodal imports MImport(t, j) of a radial
+    network to its line flows TDC = MImport @ P, and its incidence matrix A, built once per coverage set. P is the
+    pseudo-inverse of A, exact for the balanced imports of a tree or forest; lines outside the coverage carry no flow"""
+
+    key = (tuple(nodes), tuple(lines))
+    if key not in operators:
+        A = Incidence(nodes, lines)
+        active = A.any(axis=0)
+        if active.any() and np.linalg.matrix_rank(A[:, active]) < active.sum():
+            raise ValueError('the lines between {} form a loop: flows of a meshed network need the line impedances'.format(', '.join(nodes)))
+
+        P = np.zeros((len(nodes), len(lines)))
+        if active.any(): # No lines within a single node
+            P[:, active] = np.linalg.pinv(A[:, active]).transpose()
+        operators[key] = (P, A)
+
+    return operators[key]
+
 def Transmission(solution, output=False):
-    """TDC = Network.Transmission(S)"""
+    """TDC = Network.Transmission(S): the nodal imports of the solution as matrix products with the Aggregation of its
+    scenario, then the line flows from the flow Operator of its coverage and Input.Lines. Agrees with Reference within
+    rounding"""
+
+    A = Aggregate(solution.context)
+    CGas = np.nan_to_num(np.array(solution.CGas)) # GW
+
+    # Flexible supply and storage as (t, 5) series shared out to the nodes by one (5, nodes) matrix
+    shares = np.stack([A.hydro, A.bio, Share(CGas), Share(solution.CPHP), Share(solution.CBP)])
+    series = np.stack([solution.hydro, solution.bio, solution.gas, solution.DischargePH - solution.ChargePH,
+                       solution.DischargeB - solution.ChargeB], axis=1)
+
+    MPV = solution.GPV @ A.PV # Sij-GPV(t, i), MW
+
+    MImport = np.subtract(solution.MLoad, MPV, out=A.buffer) # EIM(t, j), MW
+    MImport -= series @ shares
+    MImport -= np.multiply(solution.Deficit[:, None], A.deficit, out=A.scratch)
+    if A.Inter is not None:
+        MImport -= solution.GInter @ A.Inter
+
+    # Spillage shared by the PV of each node, left in scratch
+    MSpillage = np.add(MPV, pow(10,-9), out=A.scratch) # 10^(-9) required to distribute spillage between nodes when no solar generation
+    MSpillage /= MSpillage.sum(axis=1)[:, None]
+    MSpillage *= solution.Spillage[:, None]
+    MImport += MSpillage
+
+    # Line flows of the radial network, checking the imports balance as Reference checks SEME and SBSW
+    P, Incidences = Operator(solution.Nodel, solution.context.Lines)
+    TDC = MImport @ P # TDC(t, k), MW
+    if len(solution.coverage) > 1:
+        imbalance = abs(MImport - TDC @ Incidences.transpose()).max()
+        assert imbalance <= 0.1, print('Imbalance Error', imbalance)
+
+    if output:
+        (hfactor, biofactor, gfactor, pcfactor, bfactor) = shares
+        solution.MPV = MPV
+        solution.MInter = solution.GInter @ A.Inter if A.Inter is not None else np.zeros((solution.intervals, solution.nodes))
+        solution.MHydro, solution.MBio, solution.MGas = (solution.hydro[:, None] * hfactor, solution.bio[:, None] * biofactor, solution.gas[:, None] * gfactor)
+        solution.MDischargePH, solution.MChargePH = (solution.DischargePH[:, None] * pcfactor, solution.ChargePH[:, None] * pcfactor)
+        solution.MDischargeB, solution.MChargeB = (solution.DischargeB[:, None] * bfactor, solution.ChargeB[:, None] * bfactor)
+        solution.MStoragePH, solution.MStorageB = (solution.StoragePH[:, None] * pcfactor, solution.StoragePH[:, None] * bfactor) # MStorageB as in Reference
+        solution.MDeficit = solution.Deficit[:, None] * A.deficit
+        solution.MSpillage = MSpillage.copy()
+
+    return TDC
+
+def Reference(solution, output=False):
+    """TDC = Network.Reference(S): the original per-node loop, kept for cross-checking Transmission"""
 
     Nodel, PVl, Interl = (solution.Nodel, solution.PVl, solution.Interl)
 #    Windl = solution.Windl
@@ -61,6 +170,25 @@ def Transmission(solution, output=False):
     MImport = MLoad + MChargePH + MChargeB + MSpillage \
               - MPV - MInter - MHydro - MBio - MGas - MDischargePH - MDischargeB - MDeficit # - MWind; EIM(t, j), MW
     
+    TDC = Flows(MImport, solution)
+
+    if output:
+        MStoragePH = np.tile(solution.StoragePH, (nodes, 1)).transpose() * pcfactor # SPH(t, j), MWh
+        MStorageB = np.tile(solution.StoragePH, (nodes, 1)).transpose() * bfactor # SPH(t, j), MWh
+        solution.MPV, solution.MInter, solution.MHydro, solution.MBio, solution.MGas = (MPV, MInter, MHydro, MBio, MGas)
+#        solution.MWind = MWind        
+        solution.MDischargePH, solution.MChargePH, solution.MStoragePH = (MDischargePH, MChargePH, MStoragePH)
+        solution.MDischargeB, solution.MChargeB, solution.MStorageB = (MDischargeB, MChargeB, MStorageB)
+        solution.MDeficit, solution.MSpillage = (MDeficit, MSpillage)
+
+    return TDC
+
+def Flows(MImport, solution):
+    """TDC(t, k) of the lines KDPE, TEPA, SEME, MEJO, PESE, SBSW, KTTE, PASE, JOSW, THKD, INSE, PHSB from the nodal
+    imports MImport(t, j), MW"""
+
+    Nodel, intervals = (solution.Nodel, solution.intervals)
+
     coverage = solution.coverage
     if len(coverage) > 1:
         # Imorts into external nodes
@@ -95,13 +223,4 @@ def Transmission(solution, output=False):
     else:
         TDC = np.zeros((intervals, len(solution.TLoss)))
 
-    if output:
-        MStoragePH = np.tile(solution.StoragePH, (nodes, 1)).transpose() * pcfactor # SPH(t, j), MWh
-        MStorageB = np.tile(solution.StoragePH, (nodes, 1)).transpose() * bfactor # SPH(t, j), MWh
-        solution.MPV, solution.MInter, solution.MHydro, solution.MBio, solution.MGas = (MPV, MInter, MHydro, MBio, MGas)
-#        solution.MWind = MWind        
-        solution.MDischargePH, solution.MChargePH, solution.MStoragePH = (MDischargePH, MChargePH, MStoragePH)
-        solution.MDischargeB, solution.MChargeB, solution.MStorageB = (MDischargeB, MChargeB, MStorageB)
-        solution.MDeficit, solution.MSpillage = (MDeficit, MSpillage)
-
-    return TDC
\ No newline at end of file
+    return TDC
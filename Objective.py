@@ -0,0 +1,353 @@
+# Objective function of the optimisation, importable by worker processes without the command line
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+from Input import Solution
+from Simulation import Reliability, Reliabilities, Simulate, Check
+from Network import Transmission
+from functools import partial
+from Record import Log
+from Memo import Table, Keys
+import numpy as np
+
+batch = 8 # Candidates simulated together by the vectorised objective
+cutoff = None # Cutoff of the bounded evaluations shared with the optimiser, set by the WorkerPool initializer
+counts = None # Shared counts of the evaluations cut short by Bounds and by the partial simulation, and of the full simulations
+slack = 1e-6 # Relative margin of the analytic bounds for rounding
+
+def Configure(value, counters=None):
+    """Use the cutoff and counters shared by the pool in this worker (WorkerPool initializer)"""
+
+    global cutoff, counts
+    cutoff, counts = (value, counters)
+
+def Count(k, n=1):
+    if counts is not None:
+        with counts.get_lock():
+            counts[k] += n
+
+class Cutoff:
+    """Generation callback for bounded evaluation: the cutoff becomes the larger of margin times the best and the worst
+    objective of the population. A trial bounded above it cannot replace its parent (updating='deferred'), so the
+    selection is that of the full evaluations"""
+
+    def __init__(self, value, margin, counters=None):
+        self.value, self.margin, self.counters = (value, margin, counters)
+
+    def __call__(self, solver, nit):
+        energies = solver.population_energies
+        if self.counters is not None and np.isfinite(self.value.value):
+            # The trials of this generation were evaluated with the cutoff set by the previous one
+            with self.counters.get_lock():
+                analytic, partial = self.counters[:2]
+                self.counters[0], self.counters[1] = (0, 0)
+            print('Generation {}: {:.1%} of the trials cut short by the bounds, {:.1%} by the partial simulation'.format(
+                nit, analytic / len(energies), partial / len(energies)))
+        self.value.value = max(self.margin * energies.min(), energies.max())
+        return False
+
+def Flexible(CGas, context):
+    """Flexible supply of the simulation lanes of F: (1) only baseload, (2) baseload and hydro (cheapest),
+    (3) baseload, hydro and bio (next cheapest), (4) baseload, all existing capacity and all hydrogen.
+    Returns (4, t) hydro and bio and (..., 4, t) gas for a CGas (GW) of shape (...)"""
+
+    baseload, intervals, CHydro, CBio = (context.baseload, context.intervals, context.CHydro, context.CBio)
+
+    CGas = np.asarray(CGas, dtype=np.float64)
+    hydro = np.stack([baseload] + [np.ones(intervals) * CHydro.sum() * pow(10,3)] * 3)
+    bio = np.stack([np.zeros(intervals)] * 2 + [np.ones(intervals) * CBio.sum() * pow(10, 3)] * 2)
+    gas = np.stack([np.zeros(intervals)] * 3 + [np.ones(intervals)]) * CGas[..., None, None] * pow(10, 3)
+
+    return hydro, bio, gas
+
+def Annual(x, context):
+    """(..., years) sums over the time steps of each year of the (..., t) series x, or for representative days the
+    (..., 1) weighted sum of the mean year"""
+
+    if context.weights is None:
+        return np.reshape(x, x.shape[:-1] + (-1, context.steps)).sum(axis=-1)
+    return (x @ context.weights)[..., None] / context.years
+
+def Total(x, context, axis=-1):
+    """Sum over the time steps of x along axis, each weighted by the days it represents"""
+
+    if context.weights is None:
+        return np.sum(x, axis=axis)
+    return np.moveaxis(np.asarray(x), axis, -1) @ context.weights
+
+def Penalties(Deficit, CGas, context):
+    """Energy, power and deficit penalties from the (..., 4, t) deficits of the lanes in Flexible.
+    Also returns the (..., t) existing capacity generation profiles for the final simulation"""
+
+    resolution, efficiencyPH, allowance, baseload = (context.resolution, context.efficiencyPH, context.allowance, context.baseload)
+    CBaseload, CPeak, CHydro, CBio = (context.CBaseload, context.CPeak, context.CHydro, context.CBio)
+    Hydromax, Biomax, Gasmax = (context.Hydromax, context.Biomax, context.Gasmax)
+
+    Deficit1, Deficit2, Deficit3, Deficit4 = [Deficit[..., k, :] for k in range(4)]
+    Max_deficit1 = Annual(Deficit1, context) # MWh per year over resolution
+    PFlexible_Gas = Deficit1.max(axis=-1) * pow(10, -3) # GW
+    Max_deficit2 = Annual(Deficit2, context) # MWh per year over resolution
+    PBio_Gas = Deficit2.max(axis=-1) * pow(10, -3) # GW
+    Max_deficit3 = Annual(Deficit3, context) # MWh per year over resolution
+    PGas = Deficit3.max(axis=-1) * pow(10, -3) # GW
+
+    # Assume all storage provided by PHES (lowest efficiency i.e. worst cast). Look at maximum generation years for energy penalty function
+    GHydro = resolution * (Max_deficit1 - Max_deficit2).max(axis=-1) / efficiencyPH + 8760*CBaseload.sum() * pow(10,3)
+    GBio = resolution * (Max_deficit2 - Max_deficit3).max(axis=-1) / efficiencyPH
+    GGas = resolution * (Max_deficit3).max(axis=-1) / efficiencyPH
+
+    # Power and energy penalty functions
+    PenEnergy = (np.maximum(0, GHydro - Hydromax) + np.maximum(0, GBio - Biomax) + np.maximum(0, GGas - Gasmax))*pow(10,3)
+    PenPower = (np.maximum(0,PFlexible_Gas - (CPeak.sum() + CGas)) + np.maximum(0, PBio_Gas - (CBio.sum() + CGas)) + np.maximum(0, PGas - CGas))*pow(10,3)
+
+    # Deficit penalty function
+    PenDeficit = np.maximum(0, Total(Deficit4, context) * resolution - allowance)*pow(10,3)
+
+    # Existing capacity generation profiles
+    gas = np.clip(Deficit3, 0, np.asarray(CGas)[..., None] * pow(10, 3))
+    bio = np.clip(Deficit2 - Deficit3, 0, CBio.sum() * pow(10, 3))
+    hydro = np.clip(Deficit1 - Deficit2, 0, CHydro.sum() * pow(10, 3)) + baseload
+
+    return PenEnergy, PenPower, PenDeficit, hydro, bio, gas
+
+def Cost(S, CGas, hydro, bio, gas):
+    """Transmission penalty and LCOE of a solution after its final simulation"""
+
+    C = S.context
+    resolution, years, intervals, efficiencyPH = (C.resolution, C.years, C.intervals, C.efficiencyPH)
+
+    # Discharged energy from storage systems
+    GPHES = Total(S.DischargePH, C) * resolution / years * pow(10,-6) # TWh per year
+    GBattery = Total(S.DischargeB, C) * resolution / years * pow(10,-6)
+
+    # Transmission capacity calculations
+    TDC = Transmission(S) if 'APG' in C.node else np.zeros((intervals, len(C.TLoss))) # TDC: TDC(t, k), MW
+    CDC = np.amax(abs(TDC), axis=0) * pow(10, -3) # CDC(k), MW to GW
+
+    # Transmission penalty function
+    PenDC = max(0, CDC[9] - C.CDC9max) * pow(10, 3) # GW to MW
+    PenDC += max(0, CDC[10] - C.CDC10max) * pow(10, 3) # GW to MW
+    PenDC += max(0, CDC[11] - C.CDC11max) * pow(10, 3) # GW to MW
+    PenDC *= pow(10, 3) # Blow up penalty function
+
+    # Maximum annual electricity generated by existing capacity
+    GGas = resolution * Total(gas, C) / years / efficiencyPH
+    GHydro = resolution * Total(hydro, C) / years / efficiencyPH
+    GBio = resolution * Total(bio, C) / years / efficiencyPH
+
+    # Average annual electricity imported through external interconnections
+    GInter = Total(S.GInter, C, axis=0).sum() * resolution / years if len(S.GInter) > 0 else 0
+
+    # Levelised cost of electricity calculation
+    cost = C.factor * np.array([sum(S.CPV), GInter * pow(10,-6), sum(S.CPHP), S.CPHS, sum(S.CBP), S.CBS] + list(CDC) + [sum(S.CPV), GHydro * pow(10, -6), GBio * pow(10,-6), CGas.sum(), GGas * pow(10, -6), GPHES, GBattery, 0, 0]) # $b p.a.
+    cost = cost.sum()
+    loss = Total(abs(TDC), C, axis=0) * C.TLoss
+    loss = loss.sum() * pow(10, -9) * resolution / years # PWh p.a.
+    LCOE = cost / abs(C.energy - loss)
+
+    return PenDC, LCOE
+
+def Bounds(X, context):
+    """Lower bounds (k, 3) on PenDeficit, PenEnergy and PenPower of the candidates X (k, N) without the storage
+    simulation. In every interval a lane falls short by at least its net load beyond the storage power; over the
+    whole period the storage cannot discharge more than its initial energy and what it charges from the surpluses"""
+
+    C = context
+    pidx, phidx, bidx, iidx, resolution = (C.pidx, C.phidx, C.bidx, C.iidx, C.resolution)
+
+    X = np.atleast_2d(X)
+    CGas = np.nan_to_num(X[:, iidx:]).sum(axis=1) # GW
+    Pcapacity = (X[:, pidx: phidx].sum(axis=1) + X[:, phidx: bidx].sum(axis=1)) * pow(10, 3) # PHES and battery, GW to MW
+    Initial = 0.5 * (X[:, bidx] + X[:, bidx+1]) * pow(10, 3) # GWh to MWh
+
+    # Net load of the lanes of Flexible, (k, 4, t)
+    Netload = C.MLoad.sum(axis=1) - X[:, :pidx] @ C.TSPV.transpose() * pow(10, 3) - X[:, bidx+2: iidx].sum(axis=1)[:, None] * pow(10, 3)
+    hydro, bio, gas = Flexible(CGas, context)
+    Lanes = Netload[:, None, :] - hydro - bio - gas
+    Short = np.maximum(Lanes - Pcapacity[:, None, None], 0) * (1 - slack) # Deficit(k, lane, t) at least, MW
+
+    # Lane 4 over the whole period, on a chronological context
+    Deficit4 = Total(Short[:, 3], context) * resolution # MWh
+    if C.weights is None:
+        Demand, Surplus = (np.maximum(Lanes[:, 3], 0), np.minimum(np.maximum(-Lanes[:, 3], 0), Pcapacity[:, None]))
+        Discharge = np.minimum(np.minimum(Demand, Pcapacity[:, None]).sum(axis=1) * resolution,
+                               Initial + max(C.efficiencyPH, C.efficiencyB) * Surplus.sum(axis=1) * resolution) # MWh
+        Deficit4 = np.maximum(Deficit4, (Demand.sum(axis=1) * resolution - Discharge) * (1 - slack))
+
+    PenDeficit = np.maximum(0, Deficit4 - C.allowance) * pow(10, 3)
+    PenEnergy = np.maximum(0, resolution * Annual(Short[:, 2], context).max(axis=-1) / C.efficiencyPH - C.Gasmax) * pow(10, 3)
+    PFlexible_Gas, PBio_Gas, PGas = [Short[:, k].max(axis=-1) * pow(10, -3) for k in range(3)] # GW
+    PenPower = (np.maximum(0, PFlexible_Gas - (C.CPeak.sum() + CGas)) + np.maximum(0, PBio_Gas - (C.CBio.sum() + CGas)) + np.maximum(0, PGas - CGas)) * pow(10, 3)
+
+    return np.stack([PenDeficit, PenEnergy, PenPower], axis=-1)
+
+def Floor(S, CGas):
+    """Lower bound of the LCOE from the capacities alone, without generation, transmission or losses"""
+
+    C = S.context
+    cost = C.factor * np.array([sum(S.CPV), 0, sum(S.CPHP), S.CPHS, sum(S.CBP), S.CBS] + [0] * len(C.TLoss) + [sum(S.CPV), 0, 0, CGas.sum(), 0, 0, 0, 0, 0]) # $b p.a.
+
+    return cost.sum() / C.energy
+
+def Evaluate(x, context, cutoff=None):
+    """Objective value, total penalty, PenDeficit, PenEnergy, PenPower, PenDC and LCOE of a candidate, not logged.
+    With a cutoff, a candidate whose analytic Bounds or deficit alone take its objective above it is not simulated to
+    the end: its objective is the lower bound, the capacity LCOE of Floor plus the penalty bounds or the PenDeficit so
+    far, and the components it leaves unknown are NaN, which flags the row as bounded"""
+
+    # Initialise the optimisation
+    S = Solution(x, context)
+
+    CGas = np.nan_to_num(np.array(S.CGas))
+
+    # Simulations with increasing flexible supply, one lane each
+    hydro, bio, gas = Flexible(CGas.sum(), context)
+    if cutoff is not None and np.isfinite(cutoff):
+        # Analytic bounds first: a candidate they already take above the cutoff is not simulated
+        floor = Floor(S, CGas)
+        PenDeficit, PenEnergy, PenPower = Bounds(x, context)[0]
+        if floor + PenDeficit + PenEnergy + PenPower > cutoff:
+            Count(0)
+            return (floor + PenDeficit + PenEnergy + PenPower,) + (np.nan,) * 6
+
+        # Then the lane with all flexible supply, as it alone decides PenDeficit; the others only if it completes
+        limit = context.allowance + max(cutoff - floor, 0) * pow(10, -3) # MWh
+        Last = Reliabilities(S, hydro=hydro[3], bio=bio[3], gas=gas[3], limit=limit)
+        deficit = Total(Last[2][0], context) * context.resolution
+        if deficit > limit:
+            Count(1)
+            PenDeficit = (deficit - context.allowance) * pow(10, 3)
+            return (floor + PenDeficit,) + (np.nan,) * 6
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = [np.concatenate([first, last]) for first, last in zip(
+            Reliabilities(S, hydro=hydro[:3], bio=bio[:3], gas=gas[:3]), Last)]
+    else:
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliabilities(S, hydro=hydro, bio=bio, gas=gas) # Sj-EDE(k, t), MW
+    PenEnergy, PenPower, PenDeficit, hydro, bio, gas = Penalties(Deficit, CGas.sum(), context)
+
+    # Simulation using the existing capacity generation profiles - required for storage average annual discharge
+    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=bio, gas=gas)
+
+    PenDC, LCOE = Cost(S, CGas, hydro, bio, gas)
+    Count(2)
+
+    Func = LCOE + PenDeficit + PenEnergy + PenPower + PenDC
+
+    return Func, PenDeficit+PenEnergy+PenPower+PenDC, PenDeficit, PenEnergy, PenPower, PenDC, LCOE
+
+def Deviation(pool, X, coarse, context):
+    """Evaluate values (k, 7) of the candidates X (k, N) at a coarse fidelity and at the full one, to report how far the
+    screening estimates are from the chronological simulation"""
+
+    reduced = pool.map(partial(Evaluate, context=coarse), list(X))
+    full = pool.map(partial(Evaluate, context=context), list(X))
+
+    return np.array(reduced, dtype=np.float64), np.array(full, dtype=np.float64)
+
+def F(x, context):
+    '''This is the objective function.'''
+
+    # Candidates equal to a recent one on the grid of Memo.Keys are not simulated again
+    memo = Table(context.suffix)
+    if memo is not None:
+        keys = Keys(x, context.suffix)
+        cached = memo.lookup(keys)[0]
+        if cached is not None:
+            Log(context.suffix).write(np.append(x, cached[1:]))
+            return cached[0]
+
+    values = Evaluate(x, context, cutoff.value if cutoff is not None else None)
+
+    Log(context.suffix).write(np.append(x, values[1:]))
+
+    # A bounded value is only valid below the cutoff it was computed with
+    if memo is not None and not np.isnan(values[-1]):
+        memo.store(keys, [values])
+
+    return values[0]
+
+def Free(z, context):
+    '''The objective over the free decision variables z searched by the optimiser'''
+    return F(context.expand(z), context)
+
+def FV(xs, context):
+    '''This is the objective function vectorised over an (N, S) population, returning (S).'''
+
+    C = context
+    pidx, phidx, bidx, iidx, intervals = (C.pidx, C.phidx, C.bidx, C.iidx, C.intervals)
+    efficiencyPH, efficiencyB, resolution = (C.efficiencyPH, C.efficiencyB, C.resolution)
+
+    xs = np.asarray(xs).reshape(len(xs), -1)
+    Func, rows = (np.zeros(xs.shape[1]), [])
+
+    # Only the candidates missing from the cache are simulated
+    memo, todo = (Table(C.suffix), np.arange(xs.shape[1]))
+    if memo is not None:
+        keys = Keys(xs.transpose(), C.suffix)
+        cached = memo.lookup(keys)
+        for k in np.flatnonzero([value is not None for value in cached]):
+            rows.append(np.append(xs[:, k], cached[k][1:]))
+            Func[k] = cached[k][0]
+        todo = np.flatnonzero([value is None for value in cached])
+        values = []
+
+    for start in range(0, len(todo), batch):
+        index = todo[start: start + batch]
+        X = xs[:, index].transpose() # X(k, N)
+        candidates = len(X)
+
+        CGas = np.nan_to_num(X[:, iidx:]).sum(axis=1) # GW
+        Pcapacity_PH, Pcapacity_B = (X[:, pidx: phidx].sum(axis=1) * pow(10, 3), X[:, phidx: bidx].sum(axis=1) * pow(10, 3)) # GW to MW
+        Scapacity_PH, Scapacity_B = (X[:, bidx] * pow(10, 3), X[:, bidx+1] * pow(10, 3)) # GWh to MWh
+
+        # Net load of all candidates with one matrix product: GPV(k, t) = CPV(k, i) TSPV(i, t)
+        Netload = C.MLoad.sum(axis=1) - X[:, :pidx] @ C.TSPV.transpose() * pow(10, 3) - X[:, bidx+2: iidx].sum(axis=1)[:, None] * pow(10, 3) # Sj-ENLoad(k, t), MW
+
+        # Simulations with increasing flexible supply, candidates x lanes
+        hydro, bio, gas = Flexible(CGas, context)
+        Lanes = (Netload[:, None, :] - hydro - bio - gas).reshape(-1, intervals)
+        DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power = Simulate(
+            Lanes, *[np.repeat(c, 4) for c in (Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B)], efficiencyPH, efficiencyB, resolution)
+        Deficit = Deficit_energy + Deficit_power
+        Spillage = -1 * np.minimum(Lanes + ChargePH + ChargeB - DischargePH - DischargeB, 0)
+        Check(StoragePH, StorageB, Deficit, Spillage, np.repeat(Scapacity_PH, 4), np.repeat(Scapacity_B, 4))
+        PenEnergy, PenPower, PenDeficit, hydro, bio, gas = Penalties(Deficit.reshape(candidates, 4, intervals), CGas, context)
+
+        # Simulation using the existing capacity generation profiles, one lane per candidate
+        Lanes = Netload - hydro - bio - gas
+        DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power = Simulate(
+            Lanes, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution)
+        Deficit = Deficit_energy + Deficit_power
+        Spillage = -1 * np.minimum(Lanes + ChargePH + ChargeB - DischargePH - DischargeB, 0)
+        Check(StoragePH, StorageB, Deficit, Spillage, Scapacity_PH, Scapacity_B)
+
+        for k in range(candidates):
+            S = Solution(X[k], context)
+            S.hydro, S.bio, S.gas = (hydro[k], bio[k], gas[k])
+            S.DischargePH, S.ChargePH, S.StoragePH = (DischargePH[k], ChargePH[k], StoragePH[k])
+            S.DischargeB, S.ChargeB, S.StorageB = (DischargeB[k], ChargeB[k], StorageB[k])
+            S.Deficit_energy, S.Deficit_power, S.Deficit, S.Spillage = (Deficit_energy[k], Deficit_power[k], Deficit[k], Spillage[k])
+
+            PenDC, LCOE = Cost(S, np.nan_to_num(np.array(S.CGas)), hydro[k], bio[k], gas[k])
+            rows.append(np.append(X[k], [PenDeficit[k]+PenEnergy[k]+PenPower[k]+PenDC,PenDeficit[k],PenEnergy[k],PenPower[k],PenDC,LCOE]))
+            Func[index[k]] = LCOE + PenDeficit[k] + PenEnergy[k] + PenPower[k] + PenDC
+            if memo is not None:
+                values.append((Func[index[k]],) + tuple(rows[-1][-6:]))
+        Count(2, candidates)
+
+    if memo is not None and len(todo):
+        memo.store([keys[k] for k in todo], values)
+
+    Log(context.suffix).write(rows)
+
+    return Func
+
+def Population(pool, chunks, context):
+    """Vectorised objective for differential_evolution(vectorized=True) over the free decision variables (free, S),
+    spreading the population over the pool"""
+
+    def evaluate(zs):
+        xs = context.expand(zs.transpose()).transpose()
+        return np.concatenate(pool.map(partial(FV, context=context), np.array_split(xs, min(chunks, xs.shape[1]), axis=1)))
+
+    return evaluate
@@ -3,152 +3,156 @@
 # Licensed under the MIT Licence
 # Correspondence: bin.lu@anu.edu.au
 
-from scipy.optimize import differential_evolution
-from argparse import ArgumentParser
+from Workers import WorkerPool
+from Telemetry import Telemetry, Stagnation
 import datetime as dt
+import Checkpoint
+import Islands
+import Config
+import Seed
+import Surrogate
+import Refine
+import numpy as np
 import csv
 
-parser = ArgumentParser()
-parser.add_argument('-i', default=2000, type=int, required=False, help='maxiter=4000, 400')
-parser.add_argument('-p', default=5, type=int, required=False, help='popsize=2, 10')
-parser.add_argument('-m', default=0.5, type=float, required=False, help='mutation=0.5')
-parser.add_argument('-r', default=0.3, type=float, required=False, help='recombination=0.3')
-parser.add_argument('-e', default=5, type=int, required=False, help='per-capita electricity = 5, 10, 20 MWh/year')
-parser.add_argument('-n', default='APG_MY_Isolated', type=str, required=False, help='APG_Full, APG_PMY_Only, APG_BMY_Only, APG_MY_Isolated, SB, SW...')
-parser.add_argument('-s', default='HVAC', type=str, required=False, help='HVDC, HVAC')
-parser.add_argument('-H', default='True', type=str, required=False, help='Hydrogen Firming=True,False')
-parser.add_argument('-b', default='True', type=str, required=False, help='Battery Coopimisation=True,False')
-args = parser.parse_args()
-
-scenario = args.s
-node = args.n
-percapita = args.e
-
-if args.H == "True":
-    gasScenario = True
-elif args.H == "False":
-    gasScenario = False
-else:
-    print("-H must be True or False")
-    exit()
-
-if args.b == "True":
-    batteryScenario = True
-elif args.b == "False":
-    batteryScenario = False
-else:
-    print("-b must be True or False")
-    exit()
-
-from Input import *
-from Simulation import Reliability
-from Network import Transmission
-
-def F(x):
-    '''This is the objective function.'''
-
-    # Initialise the optimisation
-    S = Solution(x)
-
-    CGas = np.nan_to_num(np.array(S.CGas))
-    
-    # Simulation with only baseload
-    Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargeB1 = Reliability(S, hydro=baseload, bio=np.zeros(intervals), gas=np.zeros(intervals)) # Sj-EDE(t, j), MW
-    Max_deficit1 = np.reshape(Deficit1, (-1, 8760)).sum(axis=-1) # MWh per year
-    PFlexible_Gas = Deficit1.max() * pow(10, -3) # GW
-
-    # Simulation with only baseload and hydro (cheapest)
-    Deficit_energy2, Deficit_power2, Deficit2, DischargePH2, DischargeB2 = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10,3), bio=np.zeros(intervals), gas=np.zeros(intervals))
-    Max_deficit2 = np.reshape(Deficit2, (-1, 8760)).sum(axis=-1) # MWh per year
-    PBio_Gas = Deficit2.max() * pow(10, -3) # GW
-
-    # Simulation with only baseload, hydro and bio (next cheapest)
-    Deficit_energy3, Deficit_power3, Deficit3, DischargePH3, DischargeB3 = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10,3), bio = np.ones(intervals) * CBio.sum() * pow(10, 3), gas=np.zeros(intervals))
-    Max_deficit3 = np.reshape(Deficit3, (-1, 8760)).sum(axis=-1) # MWh per year
-    PGas = Deficit3.max() * pow(10, -3) # GW
-    
-    # Assume all storage provided by PHES (lowest efficiency i.e. worst cast). Look at maximum generation years for energy penalty function
-    GHydro = resolution * (Max_deficit1 - Max_deficit2).max() / efficiencyPH + 8760*CBaseload.sum() * pow(10,3)
-    GBio = resolution * (Max_deficit2 - Max_deficit3).max() / efficiencyPH
-    GGas = resolution * (Max_deficit3).max() / efficiencyPH
-    
-    # Power and energy penalty functions
-    PenEnergy = (max(0, GHydro - Hydromax) + max(0, GBio - Biomax) + max(0, GGas - Gasmax))*pow(10,3)
-    PenPower = (max(0,PFlexible_Gas - (CPeak.sum() + CGas.sum())) + max(0, PBio_Gas - (CBio.sum() + CGas.sum())) + max(0, PGas - CGas.sum()))*pow(10,3)
-
-    # Simulation with baseload, all existing capacity, and all hydrogen
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10,3), bio = np.ones(intervals) * CBio.sum() * pow(10, 3), gas=np.ones(intervals) * CGas.sum() * pow(10, 3))
-    
-    # Deficit penalty function
-    PenDeficit = max(0, Deficit.sum() * resolution - S.allowance)*pow(10,3)
-
-    # Existing capacity generation profiles    
-    gas = np.clip(Deficit3, 0, CGas.sum() * pow(10, 3))
-    bio = np.clip(Deficit2 - Deficit3, 0, CBio.sum() * pow(10, 3))
-    hydro = np.clip(Deficit1 - Deficit2, 0, CHydro.sum() * pow(10, 3)) + baseload
-
-    # Simulation using the existing capacity generation profiles - required for storage average annual discharge
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=bio, gas=gas)
-
-    # Discharged energy from storage systems
-    GPHES = DischargePH.sum() * resolution / years * pow(10,-6) # TWh per year
-    GBattery = DischargeB.sum() * resolution / years * pow(10,-6)
-
-    # Transmission capacity calculations
-    TDC = Transmission(S) if 'APG' in node else np.zeros((intervals, len(TLoss))) # TDC: TDC(t, k), MW
-    CDC = np.amax(abs(TDC), axis=0) * pow(10, -3) # CDC(k), MW to GW
-
-    # Transmission penalty function
-    PenDC = max(0, CDC[9] - CDC9max) * pow(10, 3) # GW to MW
-    PenDC += max(0, CDC[10] - CDC10max) * pow(10, 3) # GW to MW
-    PenDC += max(0, CDC[11] - CDC11max) * pow(10, 3) # GW to MW
-    PenDC *= pow(10, 3) # Blow up penalty function
-
-    # Maximum annual electricity generated by existing capacity
-    GGas = resolution * gas.sum() / years / efficiencyPH
-    GHydro = resolution * hydro.sum() / years / efficiencyPH
-    GBio = resolution * bio.sum() / years / efficiencyPH
-    
-    # Average annual electricity imported through external interconnections
-    GInter = sum(sum(S.GInter)) * resolution / years if len(S.GInter) > 0 else 0
-
-    # Levelised cost of electricity calculation
-    cost = factor * np.array([sum(S.CPV), GInter * pow(10,-6), sum(S.CPHP), S.CPHS, sum(S.CBP), S.CBS] + list(CDC) + [sum(S.CPV), GHydro * pow(10, -6), GBio * pow(10,-6), CGas.sum(), GGas * pow(10, -6), GPHES, GBattery, 0, 0]) # $b p.a.
-    cost = cost.sum()
-    loss = np.sum(abs(TDC), axis=0) * TLoss
-    loss = loss.sum() * pow(10, -9) * resolution / years # PWh p.a.
-    LCOE = cost / abs(energy - loss)
-    
-    with open('Results/record_{}_{}_{}_{}_{}.csv'.format(node,scenario,percapita,batteryScenario,gasScenario), 'a', newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(np.append(x,[PenDeficit+PenEnergy+PenPower+PenDC,PenDeficit,PenEnergy,PenPower,PenDC,LCOE]))
-
-    Func = LCOE + PenDeficit + PenEnergy + PenPower + PenDC
-    
-    return Func 
-
 if __name__=='__main__':
+    parser = Config.Parser()
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint of the scenario, if any, with the surrogate training data and the -S history')
+    parser.add_argument('--warm', action='store_true', help='Seed the initial population from the results of related scenarios')
+    parser.add_argument('--surrogate', default=0, type=float, required=False, help='Fraction of the trial vectors evaluated after surrogate pre-screening; 0 for none')
+    parser.add_argument('--validate', default=10, type=int, required=False, help='Generations between full evaluations validating the surrogate')
+    parser.add_argument('--cutoff', default=0, type=float, required=False, help='Stop simulating a trial once its deficit takes it above CUTOFF times the best objective of the population, and above the worst; 0 for full simulations')
+    parser.add_argument('--refine', default=0, type=int, required=False, help='Evaluation budget of the pattern search refining the result; 0 for none')
+    parser.add_argument('--refine-time', default=600, type=float, required=False, help='Time budget of the refinement, seconds')
+    parser.add_argument('--starts', default=1, type=int, required=False, help='Solutions the refinement starts from: the result and the next best of the final population')
+    parser.add_argument('--coarse', default=1, type=int, required=False, help='Hours per time step of the exploratory generations, e.g. 2, 3 or 6; 1 for hourly throughout')
+    parser.add_argument('--span', default=None, type=int, required=False, help='Years of data of the exploratory generations; all by default')
+    parser.add_argument('--days', default=None, type=int, required=False, help='Representative days simulated in the exploratory generations; the full chronology by default')
+    parser.add_argument('--switch', default=0.5, type=float, required=False, help='Share of the generations run at the --coarse, --span or --days fidelity')
+    parser.add_argument('--confirm', default=10, type=int, required=False, help='Best candidates of the exploratory generations compared with their full evaluation')
+    args = Config.Parse(parser=parser) # Workers receive the scenario through their initializer and never parse the command line
+
+    if not args.I and args.r[0] != args.r[1]:
+        print("-r takes a range only with -I True")
+        exit()
+    if args.v and args.cutoff > 0:
+        print("--cutoff needs -v False: the vectorised objective always simulates to the end")
+        exit()
+    mutation, recombination = (args.m if args.m[0] < args.m[1] else args.m[0], args.r[0]) # A mutation range is dithering
+
+    from Input import Context
+    from Objective import Free, Population, Deviation, Cutoff
+    from functools import partial
+
+    context = Context(**Config.Scenario(args))
+
     starttime = dt.datetime.now()
     print("Optimisation starts at", starttime)
 
-#    lb = [0.]       * pzones + [0.]     * wzones + contingency_ph   + contingency_b     + [0.]      + [0.]     + [0.]    * inters + [0.] * nodes
-#    ub = [10000.]   * pzones + [300]    * wzones + [10000.] * nodes + [10000.] * nodes  + [100000.] + [100000] + [1000.] * inters + [50.] * nodes
-
-    lb = [0.]       * pzones + contingency_ph   + contingency_b                 + [0.]      + [0.]      + [0.]    * inters + ([0.] * (nodes - inters) + inters * [0])
-    ub = pv_ub + phes_ub + battery_ub + phes_s_ub + battery_s_ub + inter_ub + gas_ub
-
-    # start = np.genfromtxt('Results/init.csv', delimiter=',')    
-
-    result = differential_evolution(func=F, bounds=list(zip(lb, ub)), tol=0, # init=start,
-                                    maxiter=args.i, popsize=args.p, mutation=args.m, recombination=args.r,
-                                    disp=True, polish=False, updating='deferred', workers=-1) ###### CHANGE WORKERS BACK TO -1
-
-    with open('Results/Optimisation_resultx_{}_{}_{}_{}_{}.csv'.format(node,scenario,percapita,batteryScenario,gasScenario), 'w', newline="") as csvfile:
+    # The optimiser searches the free decision variables only; lb == ub dimensions are fixed
+    lb, ub = (context.reduce(context.lb), context.reduce(context.ub))
+    print("Decision variables: {} free of {}".format(len(lb), len(context.lb)))
+
+    # start = np.genfromtxt('Results/init.csv', delimiter=',')
+
+    # One pool for the optimisation and the deficit fill; the time series are published once and attached zero-copy
+    pool = WorkerPool(context.config(), processes=args.w, arrays={name: getattr(context, name) for name in ('MLoad', 'TSPV', 'GBaseload', 'baseload')},
+                      recording=args.R)
+    pool.report()
+
+    if args.I:
+        # Independent sub-populations, one per worker, exchanging their best members every -M generations
+        result = Islands.Run(pool, context, Islands.Options(args))
+        pool.generation.value = result.nit # Refinement steps are logged after the last island generation
+
+    else:
+        # Multi-fidelity: the first --switch of the generations on aggregated time steps, fewer years and/or
+        # representative days, the rest hourly, starting from the final coarse population. Each fidelity has its own
+        # results suffix
+        stages = [(context, args.i)]
+        if args.coarse != 1 or args.span is not None or args.days is not None:
+            generations = int(args.switch * args.i)
+            stages = [(context.coarse(args.coarse, args.span, args.days), generations), (context, args.i - generations)]
+
+        # Checkpoints every Checkpoint.interval generations; --resume continues the same trajectory from the last one
+        states = [Checkpoint.Load(Checkpoint.Path(stage.suffix)) if args.resume else None for stage, generations in stages]
+        first = max([k for k, state in enumerate(states) if state is not None], default=0)
+
+        # Warm start from the results of related scenarios (other demand, hydrogen, battery or node subsets)
+        init = Seed.Population(context, args.p) if args.warm and states[first] is None else None
+        init = context.reduce(init) if init is not None else 'latinhypercube'
+
+        for stage, generations in stages[first:]:
+            checkpoint = Checkpoint.Path(stage.suffix)
+            state = states[first] if stage is stages[first][0] else None
+            pool.generation.value = state['nit'] if state is not None else 0
+            if state is not None:
+                print("Resuming {} from generation {}".format(stage.suffix[1:-4], state['nit']))
+            elif len(stages) > 1:
+                print("{} generations of {} ({} intervals)".format(generations, stage.suffix[1:-4], stage.intervals))
+
+            # Per-generation telemetry in Results/telemetry_*.csv, stopping early on stagnation with -S
+            telemetry = Telemetry(stage, pool, [Stagnation(args.S, args.E, args.F)] if args.S > 0 else [])
+
+            # Surrogate pre-screening of the trial vectors, statistics in Results/surrogate_*.csv
+            screen = Surrogate.Screen(lb, ub, args.surrogate, args.validate, path=Surrogate.Path(stage.suffix), cutoff=pool.cutoff) if args.surrogate > 0 else None
+            callbacks = [pool.advance, telemetry] + ([screen] if screen is not None else [])
+
+            # Bounded evaluation from the second generation on, with the cutoff of this fidelity: analytic bounds, then a
+            # partial simulation. The share of the trials each cuts short is printed every generation
+            pool.cutoff.value = np.inf
+            callbacks += [Cutoff(pool.cutoff, args.cutoff, pool.counts)] if args.cutoff > 0 else []
+
+            if args.v:
+                # One batched evaluation per worker and generation instead of one task per candidate
+                func = Population(pool, pool.processes, stage)
+                result = Checkpoint.Solve(checkpoint, state, callbacks, func=screen.vectorised(func) if screen is not None else func, bounds=list(zip(lb, ub)), tol=0, init=init, # init=start,
+                                          maxiter=generations, popsize=args.p, mutation=mutation, recombination=recombination,
+                                          disp=True, polish=False, updating='deferred', vectorized=True)
+            else:
+                result = Checkpoint.Solve(checkpoint, state, callbacks, func=Free, bounds=list(zip(lb, ub)), tol=0, init=init, # init=start,
+                                          maxiter=generations, popsize=args.p, mutation=mutation, recombination=recombination,
+                                          disp=True, polish=False, updating='deferred', workers=screen.map(pool.map) if screen is not None else pool.map, args=(stage,))
+
+            init = result.population # Evaluated again at the next fidelity
+            pool.cutoff.value = np.inf
+
+            if stage is not context and args.confirm > 0:
+                # Deviation of the screening estimates of the best candidates from the full chronology
+                best = result.population[np.argsort(result.population_energies)[: args.confirm]]
+                reduced, full = Deviation(pool, context.expand(best), stage, context)
+                error = abs(reduced[:, -1] - full[:, -1]) / abs(full[:, -1])
+                print("Screening of the best {}: LCOE deviation median {:.2%}, max {:.2%}; PenDeficit mean {:.4g} against {:.4g}; {} of {} agree on feasibility".format(
+                    len(best), np.median(error), error.max(), reduced[:, 2].mean(), full[:, 2].mean(), ((reduced[:, 1] > 0) == (full[:, 1] > 0)).sum(), len(best)))
+
+    if args.refine > 0:
+        # Pattern search from the result, within its own evaluation and time budgets. With --cutoff the poll points are
+        # bounded by the incumbent, which they must beat to be taken
+        population = result.population[np.argsort(result.population_energies)] if 'population_energies' in result else result.population
+        starts = [result.x] + [z for z in population if not np.array_equal(z, result.x)][: args.starts - 1]
+
+        def progress(iteration, f):
+            pool.advance()
+            pool.cutoff.value = f if args.cutoff > 0 else np.inf
+            print("Refinement step {}: f(x)= {}".format(iteration, f))
+
+        x, fun, used = Refine.Search(partial(pool.map, partial(Free, context=context)), starts, lb, ub, args.refine, args.refine_time, progress)
+        pool.cutoff.value = np.inf
+        print("Refinement: f(x) from {} to {} in {} evaluations".format(result.fun, min(fun, result.fun), used))
+        if fun < result.fun:
+            result.x, result.fun = (x, fun)
+
+    pool.report()
+
+    x = context.expand(result.x) # Results in the full layout
+    with open('Results/Optimisation_resultx{}'.format(context.suffix), 'w', newline="") as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(result.x)
+        writer.writerow(x)
 
     endtime = dt.datetime.now()
     print("Optimisation took", endtime - starttime)
 
     from Fill import Analysis
-    Analysis(result.x,'_{}_{}_{}_{}_{}.csv'.format(node,scenario,percapita,batteryScenario,gasScenario))
+    Analysis(x, context.suffix, context, pool)
+
+    pool.close()
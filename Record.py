@@ -0,0 +1,250 @@
+# Evaluation log of the optimisation: each candidate x with its penalties and LCOE
+# Licensed under the MIT Licence
+
+from multiprocessing import util
+import datetime as dt
+import numpy as np
+import Config
+import glob
+import csv
+import os
+
+backend = os.environ.get('FIRM_RECORD', 'binary') # binary or csv (the original record_*.csv)
+chunk = 4096 # Records per binary file
+every = int(os.environ.get('FIRM_RECORD_FLUSH', 1)) # Generations between writes of the buffered records by the pool, besides each checkpoint; 0 for checkpoints only
+logs = {} # Open logs of this process by results suffix
+registered = None # Process that has registered Flush to run at its exit
+policy = ('all', None) # Recording policy ('all', None), ('top', k), ('every', n) or ('below', penalty); see Config.Policy
+generation = None # Generation counter shared with the optimiser and advanced by its differential_evolution callback
+columns = ('generation', 'evaluations', 'recorded', 'best objective', 'best LCOE', 'best total penalty') # Summary rows; generation 0 includes the initial population
+
+def Directory(suffix):
+    """Directory of the binary log of a scenario, e.g. Results/record_APG_Full_HVAC_5_True_True"""
+    return 'Results/record{}'.format(suffix[:-len('.csv')])
+
+def Configure(recording, counter=None):
+    """Recording policy and shared generation counter of this process, set by the WorkerPool initializer"""
+
+    global policy, generation
+    policy, generation = (tuple(recording), counter)
+
+def Generation():
+    """Current generation of the optimisation; 0 without a shared counter"""
+    return generation.value if generation is not None else 0
+
+class BinaryLog:
+    """Fixed-width float64 records (x, total penalty, PenDeficit, PenEnergy, PenPower, PenDC, LCOE) and generation
+    summaries, buffered per process and written as compressed .npz chunks, one series of files per worker and run. The
+    files are named by the start of the log, the worker and the chunk, so a later --resume run with a recycled PID adds
+    to the log instead of overwriting it"""
+
+    def __init__(self, suffix):
+        self.directory = Directory(suffix)
+        self.pid = os.getpid()
+        self.start = dt.datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        self.buffer, self.summaries, self.rows, self.chunks = ([], [], 0, 0)
+
+    def write(self, rows):
+        self.buffer.append(rows)
+        self.rows += len(rows)
+        if self.rows >= chunk:
+            self.flush()
+
+    def summarise(self, summary):
+        self.summaries.append(summary)
+
+    def flush(self):
+        if self.rows == 0 and not self.summaries:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, '{}-{}-{:06d}.npz'.format(self.start, self.pid, self.chunks))
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as npzfile:
+            np.savez_compressed(npzfile, records=np.concatenate(self.buffer) if self.rows else np.zeros((0, 0)),
+                                summary=np.array(self.summaries, dtype=np.float64).reshape(-1, len(columns)))
+        os.replace(temporary, path) # Readers never see a partial chunk
+        self.buffer, self.summaries, self.rows, self.chunks = ([], [], 0, self.chunks + 1)
+
+class CSVLog:
+    """The original text log, appended to on every write, with the summaries in Results/summary_*.csv"""
+
+    def __init__(self, suffix):
+        self.path = 'Results/record{}'.format(suffix)
+        self.summary = 'Results/summary{}'.format(suffix)
+        self.pid = os.getpid()
+
+    def write(self, rows):
+        if len(rows) == 0:
+            return
+        with open(self.path, 'a', newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerows(rows)
+
+    def summarise(self, summary):
+        with open(self.summary, 'a', newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(summary)
+
+    def flush(self):
+        pass
+
+backends = {'binary': BinaryLog, 'csv': CSVLog}
+
+class PolicyLog:
+    """Applies the recording policy to the records of this process and summarises each generation it took part in.
+    Only top-k holds records back until the generation ends, and never more than k: the k best of each worker
+    include the k best of the generation overall"""
+
+    def __init__(self, suffix):
+        self.log = backends[backend](suffix)
+        self.pid = self.log.pid
+        self.evaluations = 0 # Of this process, for every-n
+        self.current, self.pending, self.summary = (Generation(), None, None)
+
+    def write(self, rows):
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if Generation() != self.current:
+            self.end()
+            self.current = Generation()
+
+        # Summary of all evaluations, recorded or not
+        objective = rows[:, -1] + rows[:, -6] # LCOE + total penalty, as minimised by differential_evolution
+        best = [np.fmin.reduce(objective), np.fmin.reduce(rows[:, -1]), np.fmin.reduce(rows[:, -6])] # Bounded rows are NaN
+        if self.summary is None:
+            self.summary = [self.current, 0, 0] + best
+        self.summary[1] += len(rows)
+        self.summary[3:] = np.fmin(self.summary[3:], best).tolist()
+
+        name, value = policy
+        if name == 'top':
+            pending = rows if self.pending is None else np.concatenate([self.pending, rows])
+            self.pending = pending[np.argsort(pending[:, -1] + pending[:, -6], kind='stable')[:value]]
+        else:
+            if name == 'every':
+                rows = rows[(self.evaluations + np.arange(len(rows))) % value == 0]
+            elif name == 'below':
+                rows = rows[rows[:, -6] <= value]
+            self.summary[2] += len(rows)
+            self.log.write(rows)
+
+        self.evaluations += len(objective)
+
+    def end(self):
+        """Hand the generation's top-k and summary to the backend"""
+
+        if self.pending is not None:
+            self.summary[2] += len(self.pending)
+            self.log.write(self.pending)
+        if self.summary is not None:
+            self.log.summarise(self.summary)
+        self.pending, self.summary = (None, None)
+
+    def flush(self):
+        self.end()
+        self.log.flush()
+
+def Log(suffix):
+    """log = Record.Log(context.suffix); log.write(rows). One log per scenario and process, flushed at normal exit"""
+
+    global registered
+    if registered != os.getpid():
+        util.Finalize(None, Flush, exitpriority=10) # Runs at normal exit of the main process and of pool workers
+        registered = os.getpid()
+
+    log = logs.get(suffix)
+    if log is None or log.pid != os.getpid(): # A forked worker must not reuse its parent's buffer
+        log = logs[suffix] = PolicyLog(suffix)
+
+    return log
+
+def Flush():
+    """Write out the buffered records of this process"""
+    End(flush=True)
+
+def End(flush=False):
+    """End the generation in the logs of this process: its top-k records and summary go to the backend, which with
+    flush writes out its buffer. Run in every worker by the generation callback WorkerPool.advance"""
+
+    for log in logs.values():
+        if log.pid == os.getpid():
+            log.end()
+            if flush:
+                log.log.flush()
+
+def Files(suffix):
+    """Binary log files of a scenario, by run, worker and chunk"""
+    return sorted(glob.glob(os.path.join(Directory(suffix), '*.npz')))
+
+def Stream(suffix, key='records'):
+    """for records in Record.Stream(context.suffix): ... yields the records chunk by chunk, (k, N + 6) arrays.
+    key='summary' yields the per-worker generation summaries instead"""
+
+    files = Files(suffix)
+    for path in files:
+        with np.load(path) as npzfile:
+            values = npzfile[key]
+        if values.size:
+            yield values
+
+    path = 'Results/{}{}'.format('record' if key == 'records' else 'summary', suffix)
+    if not files and os.path.exists(path): # Written by the csv backend
+        yield np.atleast_2d(np.genfromtxt(path, delimiter=','))
+
+def Read(suffix):
+    """records = Record.Read(context.suffix) merges all records of a scenario into one (k, N + 6) array"""
+
+    records = list(Stream(suffix))
+
+    return np.concatenate(records) if records else np.zeros((0, 0))
+
+def Summary(suffix):
+    """One row per generation (see columns): the worker summaries added up and their best values"""
+
+    rows = list(Stream(suffix, 'summary'))
+    if not rows:
+        return np.zeros((0, len(columns)))
+    rows = np.concatenate(rows)
+
+    generations = np.unique(rows[:, 0])
+    summary = np.zeros((len(generations), len(columns)))
+    for i, g in enumerate(generations):
+        G = rows[rows[:, 0] == g]
+        summary[i] = [g, G[:, 1].sum(), G[:, 2].sum()] + list(np.fmin.reduce(G[:, 3:], axis=0))
+
+    return summary
+
+def Export(suffix, path):
+    """Write the binary log of a scenario in the original CSV format to path, which must not be the log of the csv
+    backend, Results/record_*.csv"""
+
+    if os.path.abspath(path) == os.path.abspath('Results/record{}'.format(suffix)):
+        raise ValueError('{} is the log of the csv backend: export to another file'.format(path))
+    files = Files(suffix)
+    if not files:
+        raise ValueError('No binary log in {}'.format(Directory(suffix)))
+
+    with open(path, 'w', newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        for file in files:
+            with np.load(file) as npzfile:
+                writer.writerows(npzfile['records'])
+
+    return True
+
+if __name__ == '__main__':
+    parser = Config.Parser()
+    parser.add_argument('--csv', default=None, type=str, required=False, help='Export the evaluation log of the scenario to this CSV file')
+    parser.add_argument('--summary', action='store_true', help='Print the summary row of each generation')
+    args = Config.Parse(parser=parser)
+    suffix = Config.Suffix(Config.Scenario(args))
+
+    records = Read(suffix)
+    print('{} records of {} columns in {} files'.format(records.shape[0], records.shape[1], len(Files(suffix))))
+
+    if args.summary:
+        print(','.join(columns))
+        for row in Summary(suffix):
+            print('{:.0f},{:.0f},{:.0f},{},{},{}'.format(*row))
+
+    if args.csv is not None:
+        Export(suffix, args.csv)
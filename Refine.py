@@ -0,0 +1,64 @@
+# Derivative-free local refinement of the optimiser's result by pattern search
+# Licensed under the MIT Licence
+
+import datetime as dt
+import numpy as np
+
+step = 0.05 # Initial step of each variable, as a fraction of |ub - lb|
+minimum = 1e-4 # Step below which a start has converged
+
+def Poll(x, steps, lb, ub):
+    """Points x +- steps along each coordinate, within the bounds (lb <= ub) and distinct from x"""
+
+    points = []
+    for i in np.flatnonzero(steps > 0):
+        for sign in (1, -1):
+            y = x.copy()
+            y[i] = np.clip(x[i] + sign * steps[i], lb[i], ub[i])
+            if y[i] != x[i]:
+                points.append(y)
+
+    return points
+
+def Search(evaluate, starts, lb, ub, evaluations=1000, seconds=600, callback=None):
+    """x, f, used = Search(evaluate, starts, lb, ub): compass search from each of the (k, N) starts with step halving.
+    evaluate maps a list of points to their objective values, e.g. partial(pool.map, partial(Free, context=context));
+    the poll points of all active starts go to it as one batch. Stops when every start has converged, or when the
+    evaluation or time budget is spent. callback(iteration, f) is called after each batch. Like differential_evolution
+    it accepts bounds with lb > ub, such as the contingency storage power of the context"""
+
+    lb, ub = (np.asarray(lb, dtype=np.float64), np.asarray(ub, dtype=np.float64))
+    lb, ub, width = (np.minimum(lb, ub), np.maximum(lb, ub), abs(ub - lb))
+    deadline = dt.datetime.now() + dt.timedelta(seconds=seconds)
+
+    X = [np.clip(np.asarray(x, dtype=np.float64), lb, ub) for x in np.atleast_2d(starts)]
+    values = list(evaluate(X))
+    used = len(X)
+    fractions = [step] * len(X)
+
+    iteration = 0
+    while used < evaluations and dt.datetime.now() < deadline:
+        active = [k for k in range(len(X)) if fractions[k] >= minimum]
+        if not active:
+            break
+
+        polls = {k: Poll(X[k], fractions[k] * width, lb, ub) for k in active}
+        batch = [(k, y) for k in active for y in polls[k]][: evaluations - used]
+        results = list(evaluate([y for k, y in batch])) if batch else []
+        used += len(batch)
+
+        for k in active:
+            trials = [(f, y) for (j, y), f in zip(batch, results) if j == k]
+            f, y = min(trials, key=lambda trial: trial[0]) if trials else (np.inf, None)
+            if f < values[k]:
+                X[k], values[k] = (y, f)
+            else:
+                fractions[k] /= 2
+
+        iteration += 1
+        if callback is not None:
+            callback(iteration, min(values))
+
+    best = int(np.argmin(values))
+
+    return X[best], values[best], used
@@ -0,0 +1,64 @@
+# Representative days: a reduced chronology of medoid days with weights, for fast screening of candidates
+# Licensed under the MIT Licence
+
+import numpy as np
+
+iterations = 20 # Most assignment and update rounds of the k-medoids
+
+def Profiles(MLoad, TSPV, length):
+    """(days, length * series) daily profiles of the demand and PV series, each scaled by its maximum"""
+
+    series = np.concatenate([MLoad, TSPV], axis=1)
+    peak = series.max(axis=0)
+    series = series / np.where(peak > 0, peak, 1)
+
+    return series.reshape(-1, length * series.shape[1])
+
+def Extremes(MLoad, TSPV, length):
+    """Days every selection keeps: the lowest PV energy, the highest peak demand and the highest daily demand"""
+
+    load, pv = (MLoad.sum(axis=1).reshape(-1, length), TSPV.sum(axis=1).reshape(-1, length))
+
+    return list(dict.fromkeys([int(pv.sum(axis=1).argmin()), int(load.max(axis=1).argmax()), int(load.sum(axis=1).argmax())]))
+
+def Distances(A, B):
+    """(a, b) Euclidean distances between the rows of A and B"""
+    return np.sqrt(np.maximum((A**2).sum(axis=1)[:, None] - 2 * A @ B.transpose() + (B**2).sum(axis=1)[None, :], 0))
+
+def Medoids(X, k, mandatory=()):
+    """medoids, labels = Medoids(X, k, mandatory): k medoid rows of X including the mandatory ones, and the cluster of
+    each row. Farthest-point seeding from the mandatory rows, then alternating assignment and medoid updates in which
+    the mandatory medoids stay fixed"""
+
+    medoids = list(mandatory)[:k] if len(mandatory) else [0]
+    distance = Distances(X, X[medoids]).min(axis=1)
+    while len(medoids) < k:
+        medoids.append(int(distance.argmax()))
+        distance = np.minimum(distance, Distances(X, X[medoids[-1:]])[:, 0])
+    medoids = np.array(medoids)
+
+    for iteration in range(iterations):
+        labels = Distances(X, X[medoids]).argmin(axis=1)
+        update = medoids.copy()
+        for c in range(len(mandatory), k):
+            members = np.flatnonzero(labels == c)
+            if len(members):
+                update[c] = members[Distances(X[members], X[members]).sum(axis=1).argmin()]
+        if np.array_equal(update, medoids):
+            break
+        medoids = update
+
+    return medoids, Distances(X, X[medoids]).argmin(axis=1)
+
+def Select(MLoad, TSPV, days, length):
+    """index, weights = Select(MLoad, TSPV, days, length): intervals of the representative days in chronological order,
+    so the storage state carries from each one to the next, and the number of days each interval represents"""
+
+    X = Profiles(MLoad, TSPV, length)
+    medoids, labels = Medoids(X, min(days, len(X)), Extremes(MLoad, TSPV, length))
+
+    order = np.argsort(medoids)
+    index = (medoids[order][:, None] * length + np.arange(length)).ravel()
+    weights = np.repeat(np.bincount(labels, minlength=len(medoids))[order], length).astype(np.float64)
+
+    return index, weights
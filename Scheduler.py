@@ -0,0 +1,126 @@
+# Local scheduler running a matrix of optimisation scenarios on the cores of one machine
+# Licensed under the MIT Licence
+
+from multiprocessing import cpu_count
+from itertools import product
+import datetime as dt
+import subprocess
+import Config
+import time
+import sys
+import os
+
+poll = 5 # Seconds between checks on the running scenarios
+
+def Scenarios(args):
+    """Input.Context arguments of all combinations of the -e, -n, -s, -b and -H values"""
+
+    values = [x if isinstance(x, list) else [x] for x in (args.n, args.s, args.e, args.b, args.H)]
+
+    return [{'node': n, 'scenario': s, 'percapita': e, 'battery': Config.Flag(b, '-b'), 'gas': Config.Flag(H, '-H')}
+            for n, s, e, b, H in product(*values)]
+
+def Cost(context):
+    """Relative cost of a generation: population size (free dimensions) x evaluation cost (PV sites and nodes)"""
+
+    return max(1, len(context.free) * (context.pzones + context.nodes))
+
+def Workers(cost, costs, cores, cap):
+    """Cores for a scenario: its share of all unfinished work, at least one and no more than its population (cap)"""
+
+    return int(min(max(1, round(cores * cost / costs)), cap, cores))
+
+def Command(config, args, workers):
+    """Optimisation.py command line of one scenario, continuing from its checkpoint if a previous run left one"""
+
+    return [sys.executable, 'Optimisation.py', '-e', str(config['percapita']), '-n', config['node'], '-s', config['scenario'],
+            '-b', str(config['battery']), '-H', str(config['gas']), '-i', str(args.i), '-p', str(args.p),
+            '-m', str(args.m), '-r', str(args.r), '-v', str(args.v), '-I', str(args.I), '-M', str(args.M), '-R', args.R, '-S', str(args.S), '-E', str(args.E), '-F', str(args.F), '-w', str(workers), '--resume'] + (['--warm'] if args.warm else []) + ['--surrogate', str(args.surrogate), '--validate', str(args.validate),
+            '--cutoff', str(args.cutoff), '--refine', str(args.refine), '--refine-time', str(args.refine_time), '--starts', str(args.starts),
+            '--coarse', str(args.coarse), '--switch', str(args.switch), '--confirm', str(args.confirm)] + (['--span', str(args.span)] if args.span is not None else []) + (['--days', str(args.days)] if args.days is not None else [])
+
+def Schedule(args, cores):
+    """Run the scenario matrix, largest first, packing scenarios onto the cores by estimated cost.
+    Scenarios with an existing Optimisation_resultx file are skipped and a failed scenario does not stop the others."""
+
+    from Input import Context
+
+    pending, running, done, failed = ([], [], [], [])
+    for config in Scenarios(args):
+        try:
+            context = Context(**config) # All contexts share the raw data loaded once by this process
+        except Exception as e:
+            failed.append(str(config))
+            print('Failed {}: {}'.format(config, e))
+            continue
+        if os.path.exists('Results/Optimisation_resultx{}'.format(context.suffix)):
+            print('Skipped (result exists):', context.suffix)
+            continue
+        pending.append((Cost(context), args.p * max(1, len(context.free)), config, context.suffix))
+    pending.sort(key=lambda x: -x[0])
+
+    while pending or running:
+        free = cores - sum(x[1] for x in running)
+        costs = sum(x[0] for x in pending) + sum(x[2] for x in running)
+
+        # First fit, largest scenario first
+        for item in list(pending):
+            cost, cap, config, suffix = item
+            workers = Workers(cost, costs, cores, cap)
+            if workers > free:
+                continue
+
+            log = open('Results/log{}'.format(suffix.replace('.csv', '.txt')), 'w')
+            process = subprocess.Popen(Command(config, args, workers), stdout=log, stderr=subprocess.STDOUT)
+            running.append((process, workers, cost, suffix, log, dt.datetime.now()))
+            pending.remove(item)
+            free -= workers
+            print('Started {} on {} cores (pid {})'.format(suffix, workers, process.pid))
+
+        time.sleep(poll)
+
+        for item in list(running):
+            process, workers, cost, suffix, log, starttime = item
+            if process.poll() is None:
+                continue
+            log.close()
+            running.remove(item)
+            if process.returncode == 0:
+                done.append(suffix)
+                print('Finished {} in {}'.format(suffix, dt.datetime.now() - starttime))
+            else:
+                failed.append(suffix)
+                print('Failed {} with exit code {}; see {}'.format(suffix, process.returncode, log.name))
+
+    return done, failed
+
+if __name__ == '__main__':
+    parser = Config.Parser(matrix=True)
+    parser.add_argument('--warm', action='store_true', help='Seed each scenario from the results of the scenarios finished before it')
+    parser.add_argument('--surrogate', default=0, type=float, required=False, help='Fraction of the trial vectors evaluated after surrogate pre-screening; 0 for none')
+    parser.add_argument('--validate', default=10, type=int, required=False, help='Generations between full evaluations validating the surrogate')
+    parser.add_argument('--cutoff', default=0, type=float, required=False, help='Stop simulating a trial once its deficit takes it above CUTOFF times the best objective of the population, and above the worst; 0 for full simulations')
+    parser.add_argument('--refine', default=0, type=int, required=False, help='Evaluation budget of the pattern search refining the result; 0 for none')
+    parser.add_argument('--refine-time', default=600, type=float, required=False, help='Time budget of the refinement, seconds')
+    parser.add_argument('--starts', default=1, type=int, required=False, help='Solutions the refinement starts from: the result and the next best of the final population')
+    parser.add_argument('--coarse', default=1, type=int, required=False, help='Hours per time step of the exploratory generations, e.g. 2, 3 or 6; 1 for hourly throughout')
+    parser.add_argument('--span', default=None, type=int, required=False, help='Years of data of the exploratory generations; all by default')
+    parser.add_argument('--days', default=None, type=int, required=False, help='Representative days simulated in the exploratory generations; the full chronology by default')
+    parser.add_argument('--switch', default=0.5, type=float, required=False, help='Share of the generations run at the --coarse, --span or --days fidelity')
+    parser.add_argument('--confirm', default=10, type=int, required=False, help='Best candidates of the exploratory generations compared with their full evaluation')
+    args = parser.parse_args()
+    args.v, args.F, args.I = (Config.Flag(args.v, '-v'), Config.Flag(args.F, '-F'), Config.Flag(args.I, '-I'))
+    Config.Policy(args.R, '-R') # Checked once here rather than in every scenario
+    cores = args.w if args.w is not None else cpu_count() # -w: cores shared by all scenarios
+
+    starttime = dt.datetime.now()
+    print("Scenario matrix starts at", starttime)
+
+    done, failed = Schedule(args, cores)
+
+    print("Scenario matrix took", dt.datetime.now() - starttime)
+    print("Finished: {}, failed: {}".format(len(done), len(failed)))
+    for suffix in failed:
+        print('• Failed:', suffix)
+
+    exit(1 if failed else 0)
@@ -0,0 +1,112 @@
+# Warm-start initial populations of the differential evolution from the results of related scenarios
+# Licensed under the MIT Licence
+
+from Input import Context, PVl
+import numpy as np
+import Record
+import glob
+import os
+
+share = 0.5 # Largest fraction of the population taken by remapped results; the rest are perturbed variants
+records = 10 # Best records taken from the evaluation log of each scenario
+sigma = (0.01, 0.2) # Range of the perturbations, as fractions of ub - lb
+
+def Layout(context):
+    """Name of each decision variable of a scenario, independent of its node subset: ('pv', i) with i the site in the
+    full PVl, ('phes', node), ('battery', node), ('phes_s', None), ('battery_s', None), ('inter', node), ('gas', node)"""
+
+    pv = np.flatnonzero(np.in1d(PVl, context.coverage))
+
+    return ([('pv', i) for i in pv] + [('phes', n) for n in context.Nodel] + [('battery', n) for n in context.Nodel]
+            + [('phes_s', None), ('battery_s', None)] + [('inter', n) for n in context.Interl] + [('gas', n) for n in context.Nodel])
+
+def Remap(X, source, target):
+    """(k, N) solutions of the source scenario in the decision vector layout of the target, capacities scaled with the
+    demand of their node (network storage with the total demand). Variables the source lacks are NaN"""
+
+    X = np.atleast_2d(X)
+    column = {name: i for i, name in enumerate(Layout(source))}
+    demand = (dict(zip(source.Nodel, source.MLoad.sum(axis=0))), dict(zip(target.Nodel, target.MLoad.sum(axis=0))))
+
+    Y = np.full((len(X), len(target.lb)), np.nan)
+    for j, (kind, name) in enumerate(Layout(target)):
+        if (kind, name) not in column:
+            continue
+        node = PVl[name] if kind == 'pv' else name
+        if node is None:
+            factor = target.energy / source.energy
+        else:
+            factor = demand[1][node] / demand[0][node] if demand[0][node] > 0 else 1.
+        Y[:, j] = X[:, column[(kind, name)]] * factor
+
+    return Y
+
+def Sources(context):
+    """Configurations of the scenarios with results in Results/, most closely related first"""
+
+    sources = []
+    for path in glob.glob('Results/Optimisation_resultx_*.csv') + glob.glob('Results/record_*'):
+        fields = os.path.basename(path).replace('.csv', '').split('_')
+        name = '_'.join(fields[(2 if fields[0] == 'Optimisation' else 1): -4])
+        scenario, percapita, battery, gas = fields[-4:]
+        if not percapita.isdigit() or battery not in ('True', 'False') or gas not in ('True', 'False'):
+            continue
+        config = {'node': name, 'scenario': scenario, 'percapita': int(percapita), 'battery': battery == 'True', 'gas': gas == 'True'}
+        if config not in sources:
+            sources.append(config)
+
+    target = context.config()
+
+    return sorted(sources, key=lambda config: sum(config[key] != target[key] for key in target))
+
+def Candidates(source):
+    """Optimisation_resultx and the best records of the evaluation log of a scenario, best first"""
+
+    X = []
+    path = 'Results/Optimisation_resultx{}'.format(source.suffix)
+    if os.path.exists(path):
+        X.append(np.atleast_2d(np.genfromtxt(path, delimiter=',')))
+
+    best = np.zeros((0, len(source.lb) + 6))
+    for rows in Record.Stream(source.suffix):
+        if rows.shape[1] == best.shape[1]:
+            best = np.concatenate([best, rows[~np.isnan(rows[:, -1])]]) # Not the bounded evaluations of --cutoff
+            best = best[np.argsort(best[:, -1] + best[:, -6], kind='stable')[:records]] # LCOE + total penalty
+    X.append(best[:, :-6])
+
+    return np.concatenate(X)
+
+def Population(context, popsize, rng=None):
+    """(popsize * free, N) initial population in the full layout (context.reduce for differential_evolution(init=...)):
+    remapped results of related scenarios, then perturbed variants of them. None if there are no results to start from"""
+
+    rng = rng if rng is not None else np.random.default_rng()
+    lb, ub = (np.array(context.lb), np.array(context.ub))
+    size = max(5, popsize * len(context.free)) # The optimiser searches the free variables only
+
+    seeds = []
+    for config in Sources(context):
+        try:
+            source = Context(**config)
+            X = Remap(Candidates(source), source, context)
+        except (OSError, ValueError) as e:
+            print('Warm start: skipped {}: {}'.format(config, e))
+            continue
+        if len(X) == 0:
+            continue
+        print('Warm start: {} solutions of {}'.format(len(X), source.suffix[1:-4]))
+        seeds.append(X)
+    if not seeds:
+        return None
+
+    # Variables missing from a source are drawn at random, then everything is brought within the bounds
+    seeds = np.concatenate(seeds)[: max(1, int(share * size))]
+    seeds = np.where(np.isnan(seeds), rng.uniform(lb, ub, seeds.shape), seeds)
+    seeds = np.unique(np.clip(seeds, lb, ub), axis=0)
+
+    # Perturbed variants of the seeds, from small to large steps
+    parents = seeds[rng.integers(len(seeds), size=size - len(seeds))]
+    scales = np.exp(rng.uniform(*np.log(sigma), size=(len(parents), 1)))
+    variants = np.clip(parents + rng.normal(size=parents.shape) * scales * (ub - lb), lb, ub)
+
+    return np.concatenate([seeds, variants])
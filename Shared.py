@@ -0,0 +1,111 @@
+# Read-only time-series arrays shared between optimisation worker processes
+# Licensed under the MIT Licence
+
+from multiprocessing import shared_memory
+import numpy as np
+import atexit
+import signal
+import os
+
+published, attached = ({}, {}) # SharedMemory blocks created and attached by this process
+owner = None # Process that published the blocks; forked workers inherit the dict but must not unlink
+exits = [] # Run by Terminate before it releases the blocks, e.g. Record.Flush
+
+def Publish(arrays):
+    """handles = Shared.Publish({'MLoad': MLoad, ...}) copies the arrays into shared memory once, in the parent.
+
+    The blocks are unlinked by Release at normal exit, on SIGTERM/SIGINT (e.g. PBS walltime), and otherwise by the
+    multiprocessing resource tracker if this process is killed outright."""
+
+    global owner
+    if owner is None:
+        owner = os.getpid()
+        atexit.register(Release)
+        Handle()
+
+    handles = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        published[name] = block
+        handles[name] = (block.name, array.shape, array.dtype.str)
+
+    return handles
+
+def Attach(handles, targets):
+    """Replace the arrays held by the given objects (modules or scenario contexts) by zero-copy, read-only views of
+    the published blocks"""
+
+    for name, (block_name, shape, dtype) in handles.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        attached[name] = block # Keep the mapping alive for the life of the worker
+        view = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        view.flags.writeable = False
+        for target in targets:
+            if hasattr(target, name):
+                setattr(target, name, view)
+
+    return True
+
+def Release():
+    """Close and unlink the blocks published by this process"""
+
+    if os.getpid() != owner:
+        return
+    for block in published.values():
+        try:
+            block.unlink() # First: a close failing while views of the block remain must not leak the segment
+        except FileNotFoundError:
+            pass
+        try:
+            block.close()
+        except BufferError:
+            pass
+    published.clear()
+
+def Handle(*functions):
+    """On SIGTERM/SIGINT (e.g. PBS walltime) this process runs the functions, e.g. Record.Flush to write its buffered
+    evaluation log, releases the blocks it published and terminates. Workers call it as they start, so that a signal
+    sent to every process does not lose their buffers"""
+
+    exits.extend(function for function in functions if function not in exits)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, Terminate)
+
+def Terminate(signum, frame):
+    """Signal handler running the exits and releasing the shared memory, then terminating with the default action"""
+
+    for function in exits:
+        try:
+            function()
+        except Exception: # Terminate regardless
+            pass
+    Release()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+def Memory(pid='self'):
+    """Resident set size (RSS) of a process, total and shared-memory part, MB (Linux /proc)"""
+
+    usage = {'VmRSS': np.nan, 'RssShmem': np.nan}
+    try:
+        with open('/proc/{}/status'.format(pid)) as status:
+            for line in status:
+                key = line.split(':')[0]
+                if key in usage:
+                    usage[key] = int(line.split()[1]) / 1024 # kB to MB
+    except OSError:
+        pass
+
+    return usage
+
+def Report(rows):
+    """Print per-worker RSS before and after the worker initializer, and now"""
+
+    print('Worker memory (MB): pid, RSS before initializer, RSS after initializer, RSS now (of which shared memory)')
+    for pid, before, after in rows:
+        now = Memory(pid)
+        print('\u2022 {}: {:.1f}, {:.1f}, {:.1f} ({:.1f})'.format(pid, before['VmRSS'], after['VmRSS'], now['VmRSS'], now['RssShmem']))
+
+    return True
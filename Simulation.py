@@ -4,25 +4,238 @@
 # Correspondence: bin.lu@anu.edu.au
 
 import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+###### STORAGE DISPATCH KERNEL ######
+# 'reference': original interval loop over numpy elements (kept for cross-checking)
+# 'python': the same arithmetic on Python floats (fallback when Numba is not installed)
+# 'numpy': one interval at a time, vectorised across simulation lanes
+# 'numba': nopython-compiled version of the 'python' kernel
+# 'scan': blocked parallel prefix scan over time chunks, see Scan
+# All but 'scan' perform identical IEEE operations in the same order; results agree with 'reference' within 1e-6 MW (MWh).
+# 'scan' sums in a different order; its storage levels agree with 'reference' within 1e-6 MWh, but an interval where a
+# discharge is limited by power and energy to within rounding can take another branch of the deficit classification.
+# Two of those branches count diff1 rather than diff2, so there the deficit itself (not only its split into energy and
+# power) can differ by the battery's net discharge. Over a year of hourly lanes this happens at a few intervals; use
+# 'scan' for the storage trajectories and a sequential kernel where the deficits must match 'reference'
+dispatch_kernel = os.environ.get('FIRM_KERNEL', 'numba' if njit is not None else 'python')
+tolerance = 1e-6
+vector_lanes = 16 # Number of lanes above which the 'python' kernel switches to 'numpy'
+scan_chunks = int(os.environ.get('FIRM_SCAN_CHUNKS', os.cpu_count() or 1)) # Time chunks (and threads) of the 'scan' kernel
+
+def Storage(Netload, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution, limit=np.inf):
+    """Storage dispatch of PHES then battery against the net load, interval by interval. Stops once the cumulative
+    deficit exceeds limit (MWh), leaving the remaining intervals zero"""
 
-def Reliability(solution, hydro, bio, gas, start=None, end=None):
-    """Deficit = Simulation.Reliability(S, hydro=...)"""
-
-    ###### CALCULATE NETLOAD FOR EACH INTERVAL ######
-    Netload = (solution.MLoad.sum(axis=1) - solution.GPV.sum(axis=1) - solution.GInter.sum(axis=1))[start:end] \
-        - hydro - bio - gas # - solution.GWind.sum(axis=1); Sj-ENLoad(j, t), MW
     length = len(Netload)
-    
-    solution.hydro = hydro # MW
-    solution.bio = bio
-    solution.gas = gas
+    DischargePH, ChargePH, StoragePH = (np.zeros(length), np.zeros(length), np.zeros(length))
+    DischargeB, ChargeB, StorageB = (np.zeros(length), np.zeros(length), np.zeros(length))
+    Deficit_energy, Deficit_power = (np.zeros(length), np.zeros(length))
 
-    ###### CREATE STORAGE SYSTEM VARIABLES ######
-    Pcapacity_PH = sum(solution.CPHP) * pow(10, 3) # S-CPHP(j), GW to MW
-    Pcapacity_B = sum(solution.CBP) * pow(10,3)
-    Scapacity_PH = solution.CPHS * pow(10, 3) # S-CPHS(j), GWh to MWh
-    Scapacity_B = solution.CBS * pow(10,3)
-    efficiencyPH, efficiencyB, resolution = (solution.efficiencyPH, solution.efficiencyB, solution.resolution)
+    Storage_PH_t1 = 0.5 * Scapacity_PH
+    Storage_B_t1 = 0.5 * Scapacity_B
+    deficit = 0.
+
+    for t in range(length):
+        Netloadt = Netload[t]
+
+        Discharge_PH_t = min(max(0., Netloadt), Pcapacity_PH, Storage_PH_t1 / resolution)
+        Charge_PH_t = min(-1 * min(0., Netloadt), Pcapacity_PH, (Scapacity_PH - Storage_PH_t1) / efficiencyPH / resolution)
+        Storage_PH_t = Storage_PH_t1 - Discharge_PH_t * resolution + Charge_PH_t * resolution * efficiencyPH
+
+        diff1 = Netloadt - Discharge_PH_t + Charge_PH_t
+
+        Discharge_B_t = min(max(0., diff1), Pcapacity_B, Storage_B_t1 / resolution)
+        Charge_B_t = min(-1 * min(0., diff1), Pcapacity_B, (Scapacity_B - Storage_B_t1) / efficiencyB / resolution)
+        Storage_B_t = Storage_B_t1 - Discharge_B_t * resolution + Charge_B_t * resolution * efficiencyB
+
+        diff2 = Netloadt - Discharge_PH_t - Discharge_B_t + Charge_PH_t + Charge_B_t
+
+        if diff2 <= 0:
+            pass
+        elif ((Discharge_PH_t == Pcapacity_PH) and (Discharge_B_t == Pcapacity_B)):
+            Deficit_power[t] = diff2
+        elif ((Discharge_PH_t == Storage_PH_t1 / resolution) and (Discharge_B_t == Storage_B_t1 / resolution)):
+            Deficit_energy[t] = diff2
+        elif ((Discharge_PH_t == Pcapacity_PH) and (Discharge_B_t == Storage_B_t1 / resolution)):
+            Deficit_energy[t] = diff2 # B energy deficit
+            Deficit_power[t] = diff1 - diff2 # PH power deficit
+        elif ((Discharge_PH_t == Storage_PH_t1 / resolution) and (Discharge_B_t == Pcapacity_B)):
+            Deficit_energy[t] = diff1 - diff2 # PH energy deficit
+            Deficit_power[t] = diff2 # B power deficit
+
+        DischargePH[t], ChargePH[t], StoragePH[t] = (Discharge_PH_t, Charge_PH_t, Storage_PH_t)
+        DischargeB[t], ChargeB[t], StorageB[t] = (Discharge_B_t, Charge_B_t, Storage_B_t)
+        Storage_PH_t1, Storage_B_t1 = (Storage_PH_t, Storage_B_t)
+
+        deficit += (Deficit_energy[t] + Deficit_power[t]) * resolution
+        if deficit > limit:
+            break
+
+    return DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power
+
+StorageJIT = njit(cache=True)(Storage) if njit is not None else None
+
+if njit is not None:
+    @njit(cache=True)
+    def StorageLanesJIT(Netload, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution):
+        """Compiled storage dispatch of each (K, t) net-load lane in turn"""
+
+        lanes, length = Netload.shape
+        Result = np.zeros((8, lanes, length))
+        for k in range(lanes):
+            DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power = StorageJIT(
+                Netload[k], Pcapacity_PH[k], Scapacity_PH[k], Pcapacity_B[k], Scapacity_B[k], efficiencyPH, efficiencyB, resolution)
+            Result[0, k], Result[1, k], Result[2, k] = (DischargePH, ChargePH, StoragePH)
+            Result[3, k], Result[4, k], Result[5, k] = (DischargeB, ChargeB, StorageB)
+            Result[6, k], Result[7, k] = (Deficit_energy, Deficit_power)
+
+        return Result
+else:
+    StorageLanesJIT = None
+
+def Deficits(Deficit_energy, Deficit_power, diff1, diff2, PH_power, PH_energy, B_power, B_energy):
+    """Split the unmet net load into energy and power deficits, in place, with the precedence of the scalar kernels"""
+
+    remaining = diff2 > 0
+    case1 = remaining & PH_power & B_power
+    remaining &= ~case1
+    case2 = remaining & PH_energy & B_energy
+    remaining &= ~case2
+    case3 = remaining & PH_power & B_energy
+    case4 = remaining & ~case3 & PH_energy & B_power
+    np.copyto(Deficit_energy, diff2, where=case2 | case3)
+    np.copyto(Deficit_energy, diff1 - diff2, where=case4) # PH energy deficit
+    np.copyto(Deficit_power, diff2, where=case1 | case4)
+    np.copyto(Deficit_power, diff1 - diff2, where=case3) # PH power deficit
+
+    return Deficit_energy, Deficit_power
+
+def Lanes(Netload, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution):
+    """Storage dispatch advancing all (K, t) net-load lanes together, one interval at a time"""
+
+    Netload = np.ascontiguousarray(Netload.transpose()) # (t, K)
+    length, lanes = Netload.shape
+    DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB = map(np.zeros, [(length, lanes)] * 6)
+    Deficit_energy, Deficit_power = map(np.zeros, [(length, lanes)] * 2)
+
+    Storage_PH_t1 = 0.5 * Scapacity_PH
+    Storage_B_t1 = 0.5 * Scapacity_B
+
+    for t in range(length):
+        Netloadt = Netload[t]
+
+        Discharge_PH_t = np.minimum(np.minimum(np.maximum(0, Netloadt), Pcapacity_PH), Storage_PH_t1 / resolution)
+        Charge_PH_t = np.minimum(np.minimum(-1 * np.minimum(0, Netloadt), Pcapacity_PH), (Scapacity_PH - Storage_PH_t1) / efficiencyPH / resolution)
+        Storage_PH_t = Storage_PH_t1 - Discharge_PH_t * resolution + Charge_PH_t * resolution * efficiencyPH
+
+        diff1 = Netloadt - Discharge_PH_t + Charge_PH_t
+
+        Discharge_B_t = np.minimum(np.minimum(np.maximum(0, diff1), Pcapacity_B), Storage_B_t1 / resolution)
+        Charge_B_t = np.minimum(np.minimum(-1 * np.minimum(0, diff1), Pcapacity_B), (Scapacity_B - Storage_B_t1) / efficiencyB / resolution)
+        Storage_B_t = Storage_B_t1 - Discharge_B_t * resolution + Charge_B_t * resolution * efficiencyB
+
+        diff2 = Netloadt - Discharge_PH_t - Discharge_B_t + Charge_PH_t + Charge_B_t
+
+        Deficits(Deficit_energy[t], Deficit_power[t], diff1, diff2, Discharge_PH_t == Pcapacity_PH, Discharge_PH_t == Storage_PH_t1 / resolution,
+                 Discharge_B_t == Pcapacity_B, Discharge_B_t == Storage_B_t1 / resolution)
+
+        DischargePH[t], ChargePH[t], StoragePH[t] = (Discharge_PH_t, Charge_PH_t, Storage_PH_t)
+        DischargeB[t], ChargeB[t], StorageB[t] = (Discharge_B_t, Charge_B_t, Storage_B_t)
+        Storage_PH_t1, Storage_B_t1 = (Storage_PH_t, Storage_B_t)
+
+    return tuple(x.transpose() for x in (DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power))
+
+def Compose(first, second):
+    """Clamp-affine map s -> clip(s + a, lo, hi) equal to applying first, then second"""
+
+    a1, lo1, hi1 = first
+    a2, lo2, hi2 = second
+
+    return a1 + a2, np.clip(lo1 + a2, lo2, hi2), np.clip(hi1 + a2, lo2, hi2)
+
+def Prefix(a, lo, hi):
+    """Inclusive prefix composition of the clamp-affine maps along the last axis (Hillis-Steele, log2(t) vector passes)"""
+
+    a, lo, hi = (a.copy(), lo.copy(), hi.copy())
+    length, d = (a.shape[-1], 1)
+    while d < length:
+        a[..., d:], lo[..., d:], hi[..., d:] = Compose((a[..., :-d], lo[..., :-d], hi[..., :-d]), (a[..., d:], lo[..., d:], hi[..., d:]))
+        d *= 2
+
+    return a, lo, hi
+
+def Trajectory(a, Scapacity, Storage_0, chunks):
+    """Storage levels s(t) = clip(s(t-1) + a(t), 0, Scapacity) of (K, t) lanes as a blocked parallel prefix scan.
+
+    Each time chunk composes its maps independently (one thread each), the chunk totals are chained sequentially
+    to find the storage level entering each chunk, and each chunk then applies its prefix maps to that level."""
+
+    lo, hi = (np.zeros_like(a), np.broadcast_to(Scapacity[:, None], a.shape).copy())
+    bounds = np.linspace(0, a.shape[-1], min(chunks, a.shape[-1]) + 1).astype(int)
+    blocks = [slice(i, j) for i, j in zip(bounds[:-1], bounds[1:])]
+
+    with ThreadPoolExecutor(max_workers=len(blocks)) as executor:
+        prefixes = list(executor.map(lambda b: Prefix(a[:, b], lo[:, b], hi[:, b]), blocks))
+
+        entry = [Storage_0]
+        for A, L, H in prefixes[:-1]:
+            entry.append(np.clip(entry[-1] + A[:, -1], L[:, -1], H[:, -1]))
+
+        levels = list(executor.map(lambda i: np.clip(entry[i][:, None] + prefixes[i][0], prefixes[i][1], prefixes[i][2]), range(len(blocks))))
+
+    return np.concatenate(levels, axis=-1)
+
+def Scan(Netload, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution, chunks=None):
+    """Storage dispatch of (K, t) net-load lanes as two associative scans over time.
+
+    With the storage level s clamped to [0, Scapacity], each interval maps s to clip(s + a(t), 0, Scapacity) where
+    a(t) = -resolution * min(Netload, Pcapacity) when discharging and resolution * efficiency * min(-Netload, Pcapacity)
+    when charging. Compositions of such maps stay clamp-affine, so the trajectory is a prefix scan. PHES is scanned
+    first; the battery is then scanned against the residual diff1 as in the sequential kernels.
+
+    The deficits follow the branches of the sequential kernels, which compare discharges with the power and energy
+    limits exactly. Where a discharge meets both limits to within rounding, the branch taken depends on the order of
+    the sums and the deficit can differ from 'reference' by the battery's net discharge (see the FIRM_KERNEL notes)"""
+
+    chunks = chunks if chunks is not None else scan_chunks
+    Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B = [x[:, None] for x in (Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B)]
+
+    ###### PHES ######
+    a = np.where(Netload > 0, -1 * np.minimum(Netload, Pcapacity_PH) * resolution, np.minimum(-1 * Netload, Pcapacity_PH) * resolution * efficiencyPH)
+    StoragePH = Trajectory(a, Scapacity_PH[:, 0], 0.5 * Scapacity_PH[:, 0], chunks)
+    Storage_PH_t1 = np.concatenate([0.5 * Scapacity_PH, StoragePH[:, :-1]], axis=1)
+
+    DischargePH = np.minimum(np.minimum(np.maximum(0, Netload), Pcapacity_PH), Storage_PH_t1 / resolution)
+    ChargePH = np.minimum(np.minimum(-1 * np.minimum(0, Netload), Pcapacity_PH), (Scapacity_PH - Storage_PH_t1) / efficiencyPH / resolution)
+    diff1 = Netload - DischargePH + ChargePH
+
+    ###### BATTERY ######
+    a = np.where(diff1 > 0, -1 * np.minimum(diff1, Pcapacity_B) * resolution, np.minimum(-1 * diff1, Pcapacity_B) * resolution * efficiencyB)
+    StorageB = Trajectory(a, Scapacity_B[:, 0], 0.5 * Scapacity_B[:, 0], chunks)
+    Storage_B_t1 = np.concatenate([0.5 * Scapacity_B, StorageB[:, :-1]], axis=1)
+
+    DischargeB = np.minimum(np.minimum(np.maximum(0, diff1), Pcapacity_B), Storage_B_t1 / resolution)
+    ChargeB = np.minimum(np.minimum(-1 * np.minimum(0, diff1), Pcapacity_B), (Scapacity_B - Storage_B_t1) / efficiencyB / resolution)
+    diff2 = Netload - DischargePH - DischargeB + ChargePH + ChargeB
+
+    ###### DETERMINE DEFICITS ######
+    Deficit_energy, Deficit_power = Deficits(np.zeros_like(Netload), np.zeros_like(Netload), diff1, diff2,
+                                             DischargePH == Pcapacity_PH, DischargePH == Storage_PH_t1 / resolution,
+                                             DischargeB == Pcapacity_B, DischargeB == Storage_B_t1 / resolution)
+
+    return DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power
+
+def Reference(Netload, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution):
+    """Original interval loop, kept as the reference for the dispatch kernels"""
+
+    length = len(Netload)
 
     DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB = map(np.zeros, [length] * 6)
     Deficit_energy, Deficit_power = map(np.zeros, [length] * 2)
@@ -69,16 +282,102 @@ def Reliability(solution, hydro, bio, gas, start=None, end=None):
             Deficit_power[t] = diff1 - diff2 # PH power deficit 
         elif ((Discharge_PH_t == Storage_PH_t1 / resolution) and (Discharge_B_t == Pcapacity_B)):
             Deficit_energy[t] = diff1 - diff2 # PH energy deficit
-            Deficit_power[t] = diff2 # B power deficit        
+            Deficit_power[t] = diff2 # B power deficit
+
+    return DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power
+
+def Simulate(Netload, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution, kernel=None, limit=None):
+    """Storage dispatch of (K, t) net-load lanes with per-lane capacities (K), returns (K, t) arrays. With a limit (MWh)
+    the 'numba' and 'python' kernels stop a lane once its cumulative deficit exceeds it; the others ignore it"""
+
+    kernel = kernel if kernel is not None else dispatch_kernel
+    lanes = Netload.shape[0]
+    capacities = [np.broadcast_to(np.asarray(x, dtype=np.float64), (lanes,)) for x in (Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B)]
+    constants = (float(efficiencyPH), float(efficiencyB), float(resolution))
+
+    if limit is not None and kernel in ('numba', 'python'):
+        storage = StorageJIT if kernel == 'numba' and StorageJIT is not None else Storage
+        Result = [storage(np.ascontiguousarray(Netload[k], dtype=np.float64), *[float(x[k]) for x in capacities], *constants, float(limit)) for k in range(lanes)]
+    elif kernel == 'numba' and StorageLanesJIT is not None:
+        return tuple(StorageLanesJIT(np.ascontiguousarray(Netload, dtype=np.float64), *[np.ascontiguousarray(x) for x in capacities], *constants))
+    elif kernel == 'scan':
+        return Scan(np.asarray(Netload, dtype=np.float64), *capacities, *constants)
+    elif kernel == 'numpy' or (kernel in ('numba', 'python') and lanes > vector_lanes):
+        return Lanes(Netload, *capacities, *constants)
+    elif kernel in ('numba', 'python'):
+        Result = [Storage(Netload[k].tolist(), *[float(x[k]) for x in capacities], *constants) for k in range(lanes)]
+    elif kernel == 'reference':
+        Result = [Reference(Netload[k], *[float(x[k]) for x in capacities], *constants) for k in range(lanes)]
+    else:
+        raise ValueError('Unknown dispatch kernel: {}'.format(kernel))
+
+    return tuple(np.stack(x) for x in zip(*Result))
+
+def Check(StoragePH, StorageB, Deficit, Spillage, Scapacity_PH, Scapacity_B):
+    """Error checking of simulated (t) or (K, t) results against storage capacities (scalar or (K))"""
+
+    assert np.all((0 <= np.amax(StoragePH, axis=-1).astype(int)) & (np.amax(StoragePH, axis=-1).astype(int) <= Scapacity_PH)), 'Storage below zero or exceeds max storage capacity'
+    assert np.all((0 <= np.amax(StorageB, axis=-1).astype(int)) & (np.amax(StorageB, axis=-1).astype(int) <= Scapacity_B)), 'StorageB below zero or exceeds max storage capacity'
+    assert np.amin(Deficit) > -0.1, 'DeficitD below zero'
+    assert np.amin(Spillage) >= 0, 'Spillage below zero'
+
+    return True
+
+def Reliabilities(solution, hydro, bio, gas, start=None, end=None, kernel=None, limit=None):
+    """Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Simulation.Reliabilities(S, hydro=np.stack([...]), ...)
+
+    Simulates K flexible-supply profiles of the same solution in one pass over time. hydro, bio and gas are (K, t)
+    arrays (or (t) arrays shared by all lanes) and all results are (K, t) arrays. The solution object is not updated.
+    With a limit (MWh) a lane may stop early once its cumulative deficit exceeds it, see Simulate."""
+
+    ###### CALCULATE NETLOAD FOR EACH LANE AND INTERVAL ######
+    Netload = np.atleast_2d(solution.Netload[start:end] - hydro - bio - gas) # Sj-ENLoad(k, t), MW
+    lanes = Netload.shape[0]
+
+    ###### CREATE STORAGE SYSTEM VARIABLES ######
+    Pcapacity_PH = sum(solution.CPHP) * pow(10, 3) # S-CPHP(j), GW to MW
+    Pcapacity_B = sum(solution.CBP) * pow(10,3)
+    Scapacity_PH = solution.CPHS * pow(10, 3) # S-CPHS(j), GWh to MWh
+    Scapacity_B = solution.CBS * pow(10,3)
+    efficiencyPH, efficiencyB, resolution = (solution.efficiencyPH, solution.efficiencyB, solution.resolution)
+
+    DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power = Simulate(
+        Netload, Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution, kernel=kernel, limit=limit)
 
     Deficit = Deficit_energy + Deficit_power
     Spillage = -1 * np.minimum(Netload + ChargePH + ChargeB - DischargePH - DischargeB, 0)
 
     ###### ERROR CHECKING ######
-    assert 0 <= int(np.amax(StoragePH)) <= Scapacity_PH, 'Storage below zero or exceeds max storage capacity'
-    assert 0 <= int(np.amax(StorageB)) <= Scapacity_B, 'StorageB below zero or exceeds max storage capacity'
-    assert np.amin(Deficit) > -0.1, 'DeficitD below zero'
-    assert np.amin(Spillage) >= 0, 'Spillage below zero'
+    Check(StoragePH, StorageB, Deficit, Spillage, Scapacity_PH, Scapacity_B)
+
+    return Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB
+
+def Reliability(solution, hydro, bio, gas, start=None, end=None, kernel=None, limit=None):
+    """Deficit = Simulation.Reliability(S, hydro=...), stopping early with a limit (MWh) as in Reliabilities"""
+
+    ###### CALCULATE NETLOAD FOR EACH INTERVAL ######
+    Netload = solution.Netload[start:end] - hydro - bio - gas # Sj-ENLoad(j, t), MW
+    
+    solution.hydro = hydro # MW
+    solution.bio = bio
+    solution.gas = gas
+
+    ###### CREATE STORAGE SYSTEM VARIABLES ######
+    Pcapacity_PH = sum(solution.CPHP) * pow(10, 3) # S-CPHP(j), GW to MW
+    Pcapacity_B = sum(solution.CBP) * pow(10,3)
+    Scapacity_PH = solution.CPHS * pow(10, 3) # S-CPHS(j), GWh to MWh
+    Scapacity_B = solution.CBS * pow(10,3)
+    efficiencyPH, efficiencyB, resolution = (solution.efficiencyPH, solution.efficiencyB, solution.resolution)
+
+    ###### DISPATCH STORAGE SYSTEMS ######
+    DischargePH, ChargePH, StoragePH, DischargeB, ChargeB, StorageB, Deficit_energy, Deficit_power = [x[0] for x in Simulate(
+        Netload[None, :], Pcapacity_PH, Scapacity_PH, Pcapacity_B, Scapacity_B, efficiencyPH, efficiencyB, resolution, kernel=kernel, limit=limit)]
+
+    Deficit = Deficit_energy + Deficit_power
+    Spillage = -1 * np.minimum(Netload + ChargePH + ChargeB - DischargePH - DischargeB, 0)
+
+    ###### ERROR CHECKING ######
+    Check(StoragePH, StorageB, Deficit, Spillage, Scapacity_PH, Scapacity_B)
 
     ###### UPDATE SOLUTION OBJECT ######
     solution.DischargePH, solution.ChargePH, solution.StoragePH = (DischargePH, ChargePH, StoragePH)
@@ -88,30 +387,38 @@ def Reliability(solution, hydro, bio, gas, start=None, end=None):
     return Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB
 
 if __name__ == '__main__':
-    from Input import *
+    from Input import Context, Solution
     from Network import Transmission 
+    from Cache import Load
+    import Config
+
+    context = Context(**Config.Scenario(Config.Parse()))
+    baseload, intervals, CHydro, CBio, CBaseload, CPeak = (context.baseload, context.intervals, context.CHydro, context.CBio, context.CBaseload, context.CPeak)
+    resolution, years, steps, efficiencyPH, node, scenario = (context.resolution, context.years, context.steps, context.efficiencyPH, context.node, context.scenario)
+    Hydromax, Biomax, Gasmax, TLoss, MLoad, energy, factor = (context.Hydromax, context.Biomax, context.Gasmax, context.TLoss, context.MLoad, context.energy, context.factor)
+    CDC9max, CDC10max, CDC11max = (context.CDC9max, context.CDC10max, context.CDC11max)
 
-    suffix = "_APG_PMY_Only_HVAC_5_TRUE_TRUE.csv"
+    suffix = context.suffix
     Optimisation_x = np.genfromtxt('Results/Optimisation_resultx{}'.format(suffix), delimiter=',')
     
     # Initialise the optimisation
-    S = Solution(Optimisation_x)
+    S = Solution(Optimisation_x, context)
 
     CGas = np.nan_to_num(np.array(S.CGas))
     
-    # Simulation with only baseload
-    Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargeB1 = Reliability(S, hydro=baseload, bio=np.zeros(intervals), gas=np.zeros(intervals)) # Sj-EDE(t, j), MW
-    Max_deficit1 = np.reshape(Deficit1, (-1, 8760)).sum(axis=-1) # MWh per year
+    # Simulation lanes: (1) only baseload, (2) baseload and hydro (cheapest), (3) baseload, hydro and bio (next cheapest),
+    # (4) baseload, all existing capacity and all hydrogen
+    hydro = np.stack([baseload] + [np.ones(intervals) * CHydro.sum() * pow(10,3)] * 3)
+    bio = np.stack([np.zeros(intervals)] * 2 + [np.ones(intervals) * CBio.sum() * pow(10, 3)] * 2)
+    gas = np.stack([np.zeros(intervals)] * 3 + [np.ones(intervals) * CGas.sum() * pow(10, 3)])
+    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliabilities(S, hydro=hydro, bio=bio, gas=gas) # Sj-EDE(k, t), MW
+    Deficit1, Deficit2, Deficit3, Deficit4 = Deficit
+
+    Max_deficit1 = np.reshape(Deficit1, (-1, steps)).sum(axis=-1) # MWh per year over resolution
     PFlexible_Gas = Deficit1.max() * pow(10, -3) # GW
-
-    # Simulation with only baseload and hydro (cheapest)
-    Deficit_energy2, Deficit_power2, Deficit2, DischargePH2, DischargeB2 = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10,3), bio=np.zeros(intervals), gas=np.zeros(intervals))
-    Max_deficit2 = np.reshape(Deficit2, (-1, 8760)).sum(axis=-1) # MWh per year
+    Max_deficit2 = np.reshape(Deficit2, (-1, steps)).sum(axis=-1) # MWh per year over resolution
     PBio_Gas = Deficit2.max() * pow(10, -3) # GW
-
-    # Simulation with only baseload, hydro and bio (next cheapest)
-    Deficit_energy3, Deficit_power3, Deficit3, DischargePH3, DischargeB3 = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10,3), bio = np.ones(intervals) * CBio.sum() * pow(10, 3), gas=np.zeros(intervals))
-    Max_deficit3 = np.reshape(Deficit3, (-1, 8760)).sum(axis=-1) # MWh per year
+    Max_deficit3 = np.reshape(Deficit3, (-1, steps)).sum(axis=-1) # MWh per year over resolution
     PGas = Deficit3.max() * pow(10, -3) # GW
     
     # Assume all storage provided by PHES (lowest efficiency i.e. worst cast). Look at maximum generation years for energy penalty function
@@ -127,11 +434,8 @@ if __name__ == '__main__':
 
     print("Powers: ",PFlexible_Gas,PBio_Gas,PGas)
     
-    # Simulation with baseload, all existing capacity, and all hydrogen
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=np.ones(intervals) * CHydro.sum() * pow(10,3), bio = np.ones(intervals) * CBio.sum() * pow(10, 3), gas=np.ones(intervals) * CGas.sum() * pow(10, 3))
-    
     # Deficit penalty function
-    PenDeficit = max(0, Deficit.sum() * resolution - S.allowance)*pow(10,3)
+    PenDeficit = max(0, Deficit4.sum() * resolution - S.allowance)*pow(10,3)
 
     # Existing capacity generation profiles    
     gas = np.clip(Deficit3, 0, CGas.sum() * pow(10, 3))
@@ -164,9 +468,9 @@ if __name__ == '__main__':
     GHydro = resolution * hydro.sum() / years / efficiencyPH
     GBio = resolution * bio.sum() / years / efficiencyPH
 
-    GGas_max = np.reshape(gas, (-1, 8760)).sum(axis=-1).max()
-    GHydro_max = np.reshape(hydro, (-1, 8760)).sum(axis=-1).max()
-    GBio_max = np.reshape(bio, (-1, 8760)).sum(axis=-1).max()
+    GGas_max = np.reshape(gas, (-1, steps)).sum(axis=-1).max() * resolution
+    GHydro_max = np.reshape(hydro, (-1, steps)).sum(axis=-1).max() * resolution
+    GBio_max = np.reshape(bio, (-1, steps)).sum(axis=-1).max() * resolution
     
     # Average annual electricity imported through external interconnections
     GInter = sum(sum(S.GInter)) * resolution / years if len(S.GInter) > 0 else 0
@@ -188,9 +492,9 @@ if __name__ == '__main__':
 
     # Import cost factors
     if scenario == 'HVDC':
-        factor = np.genfromtxt('Data/factor.csv', dtype=None, delimiter=',', encoding=None)
+        factor = Load('Data/factor.csv', dtype=None, delimiter=',', encoding=None)
     elif scenario == 'HVAC':
-        factor = np.genfromtxt('Data/factor_hvac.csv', dtype=None, delimiter=',', encoding=None)
+        factor = Load('Data/factor_hvac.csv', dtype=None, delimiter=',', encoding=None)
         
     factor = dict(factor)
     print("Cost Factors")
@@ -4,16 +4,19 @@
 # Licensed under the MIT Licence
 # Correspondence: bin.lu@anu.edu.au
 
-from Input import *
+from Input import Solution
 from Simulation import Reliability
 from Network import Transmission
 
 import numpy as np
 import datetime as dt
+from Cache import Load
 
 def Debug(solution):
     """Debugging"""
 
+    intervals, resolution = (solution.intervals, solution.resolution)
+
     Load, PV, Inter = (solution.MLoad.sum(axis=1), solution.GPV.sum(axis=1), solution.GInter.sum(axis=1))
 #    Wind = solution.GWind.sum(axis=1)
     Hydro, Bio, Gas = (solution.MHydro.sum(axis=1), solution.MBio.sum(axis=1), solution.MGas.sum(axis=1))
@@ -63,6 +66,10 @@ def Debug(solution):
 def LPGM(solution):
     """Load profiles and generation mix data"""
 
+    context = solution.context
+    node, scenario, percapita, batteryScenario, gasScenario = (context.node, context.scenario, context.percapita, context.batteryScenario, context.gasScenario)
+    Nodel, intervals, nodes, resolution, firstyear, coverage = (context.Nodel, context.intervals, context.nodes, context.resolution, context.firstyear, context.coverage)
+
     Debug(solution)
 
     C = np.stack([(solution.MLoad).sum(axis=1), (solution.MGas).sum(axis=1),
@@ -108,11 +115,15 @@ def LPGM(solution):
 
 def GGTA(solution):
     """GW, GWh, TWh p.a. and A$/MWh information"""
+
+    context = solution.context
+    node, scenario, percapita, batteryScenario, gasScenario = (context.node, context.scenario, context.percapita, context.batteryScenario, context.gasScenario)
+    resolution, years, dc_flags, MLoad, TLoss, CHydro, CBio = (context.resolution, context.years, context.dc_flags, context.MLoad, context.TLoss, context.CHydro, context.CBio)
     # Import cost factors
     if scenario == 'HVDC':
-        factor = np.genfromtxt('Data/factor.csv', dtype=None, delimiter=',', encoding=None)
+        factor = Load('Data/factor.csv', dtype=None, delimiter=',', encoding=None)
     elif scenario == 'HVAC':
-        factor = np.genfromtxt('Data/factor_hvac.csv', dtype=None, delimiter=',', encoding=None)
+        factor = Load('Data/factor_hvac.csv', dtype=None, delimiter=',', encoding=None)
         
     factor = dict(factor)
 
@@ -224,13 +235,16 @@ def GGTA(solution):
 
     return True
 
-def Information(x, hydro , bio, gas):
-    """Dispatch: Statistics.Information(x, Flex)"""
+def Information(x, hydro , bio, gas, context):
+    """Statistics.Information(x, hydro, bio, gas, context)"""
 
     start = dt.datetime.now()
     print("Statistics start at", start)
 
-    S = Solution(x)
+    node, intervals, nodes, resolution, steps = (context.node, context.intervals, context.nodes, context.resolution, context.steps)
+    CHydro, CBio, Hydromax, Biomax, Gasmax = (context.CHydro, context.CBio, context.Hydromax, context.Biomax, context.Gasmax)
+
+    S = Solution(x, context)
     Deficit_energy, Deficit_power, Deficit, DischargePH, DischargeB = Reliability(S, hydro=hydro, bio=bio, gas=gas)
 
     try:
@@ -238,9 +252,9 @@ def Information(x, hydro , bio, gas):
     except AssertionError:
         pass
     
-    assert np.reshape(hydro, (-1, 8760)).sum(axis=-1).max() <= Hydromax, f"Hydro generation exceeds requirement {np.reshape(hydro, (-1, 8760)).sum(axis=-1).max()} {Hydromax}"
-    assert np.reshape(bio, (-1, 8760)).sum(axis=-1).max() <= Biomax, f"Bio generation exceeds requirement {np.reshape(bio, (-1, 8760)).sum(axis=-1).max()} {Biomax}"
-    assert np.reshape(gas, (-1, 8760)).sum(axis=-1).max() <= Gasmax, f"Gas generation exceeds requirement {np.reshape(gas, (-1, 8760)).sum(axis=-1).max()} {Gasmax}"
+    assert np.reshape(hydro, (-1, steps)).sum(axis=-1).max() * resolution <= Hydromax, f"Hydro generation exceeds requirement {np.reshape(hydro, (-1, steps)).sum(axis=-1).max() * resolution} {Hydromax}"
+    assert np.reshape(bio, (-1, steps)).sum(axis=-1).max() * resolution <= Biomax, f"Bio generation exceeds requirement {np.reshape(bio, (-1, steps)).sum(axis=-1).max() * resolution} {Biomax}"
+    assert np.reshape(gas, (-1, steps)).sum(axis=-1).max() * resolution <= Gasmax, f"Gas generation exceeds requirement {np.reshape(gas, (-1, steps)).sum(axis=-1).max() * resolution} {Gasmax}"
 
     #S.TDC = Transmission(S, output=True) if 'APG' in node else np.zeros((intervals, len(TLoss))) # TDC(t, k), MW
     S.TDC = Transmission(S, output=True)
@@ -293,9 +307,13 @@ def Information(x, hydro , bio, gas):
     return True
 
 if __name__ == '__main__':
-    suffix = "_APG_PMY_Only_HVAC_5_TRUE_TRUE.csv"
+    from Input import Context
+    import Config
+
+    context = Context(**Config.Scenario(Config.Parse()))
+    suffix = context.suffix
     Optimisation_x = np.genfromtxt('Results/Optimisation_resultx{}'.format(suffix), delimiter=',')
     hydro = np.genfromtxt('Results/Dispatch_Hydro{}'.format(suffix), delimiter=',', skip_header=1)
     bio = np.genfromtxt('Results/Dispatch_Bio{}'.format(suffix), delimiter=',', skip_header=1)
     gas = np.genfromtxt('Results/Dispatch_Gas{}'.format(suffix), delimiter=',', skip_header=1)
-    Information(Optimisation_x, hydro, bio, gas)
\ No newline at end of file
+    Information(Optimisation_x, hydro, bio, gas, context)
\ No newline at end of file
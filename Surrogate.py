@@ -0,0 +1,119 @@
+# Surrogate-assisted pre-screening of the trial vectors of the differential evolution
+# Licensed under the MIT Licence
+
+from scipy.interpolate import RBFInterpolator
+import numpy as np
+import csv
+import os
+
+columns = ('generation', 'trials', 'evaluated', 'hit rate', 'median relative error', 'missed')
+
+def Path(suffix):
+    """Surrogate statistics of a scenario, e.g. Results/surrogate_APG_Full_HVAC_5_True_True.csv"""
+    return 'Results/surrogate{}'.format(suffix)
+
+class Screen:
+    """Radial basis function model of log(1 + objective), trained online on every true evaluation, which decides each
+    generation (updating='deferred') which trials the true objective evaluates: the fraction with the largest predicted
+    improvement on their parents. The other trials get the surrogate estimate, raised if need be just above the energy of
+    their parent so that differential_evolution never accepts an unevaluated trial. Every validate generations all trials
+    are evaluated, measuring how many improving trials the screen would have missed.
+
+    screen = Screen(lb, ub, 0.3, path=Surrogate.Path(suffix)) is both a generation callback of Checkpoint.Solve and a
+    wrapper of the evaluation: workers=screen.map(pool.map) or func=screen.vectorised(Population(...)). With the shared
+    cutoff of the bounded evaluations (pool.cutoff), the values above it are lower bounds and are not learnt"""
+
+    def __init__(self, lb, ub, fraction, validate=10, memory=2000, path=None, cutoff=None):
+        lb, ub = (np.asarray(lb, dtype=np.float64), np.asarray(ub, dtype=np.float64))
+        self.lb, self.scale = (np.minimum(lb, ub), np.where(ub != lb, abs(ub - lb), 1.))
+        self.fraction, self.validate, self.memory = (fraction, validate, memory)
+        self.X, self.y = (np.zeros((0, len(lb))), np.zeros(0))
+        self.solver, self.generation = (None, 0)
+        self.path, self.cutoff = (path, cutoff)
+
+        if path is not None and not os.path.exists(path):
+            with open(path, 'w', newline="") as csvfile:
+                csv.writer(csvfile).writerow(columns)
+
+    def __call__(self, solver, nit):
+        self.solver, self.generation = (solver, nit)
+        return False
+
+    def state(self):
+        """Training data for Checkpoint.Save"""
+        return {'X': self.X, 'y': self.y}
+
+    def restore(self, solver, nit, state):
+        """Continue from a checkpoint with its training data, screening from the first generation resumed"""
+        self.solver, self.generation = (solver, nit)
+        self.X, self.y = (state['X'], state['y'])
+
+    def learn(self, X, values):
+        """Keep the latest true evaluations"""
+
+        finite = np.isfinite(values) & (values <= (self.cutoff.value if self.cutoff is not None else np.inf))
+        self.X = np.concatenate([self.X, self.unit(X[finite])])[-self.memory:]
+        self.y = np.concatenate([self.y, np.log1p(np.maximum(values[finite], 0))])[-self.memory:]
+
+    def unit(self, X):
+        return (X - self.lb) / self.scale
+
+    def model(self):
+        """The RBF model of the training data, or None while it is too small or singular"""
+
+        X, index = np.unique(self.X, axis=0, return_index=True)
+        if len(X) < 2 * (X.shape[1] + 1):
+            return None
+        try:
+            return RBFInterpolator(X, self.y[index], kernel='thin_plate_spline', neighbors=min(len(X), max(50, 2 * (X.shape[1] + 1))), smoothing=1e-9)
+        except (np.linalg.LinAlgError, ValueError):
+            return None
+
+    def screen(self, X, evaluate):
+        """Objective values of the (S, N) trials X, evaluating only the promising ones with evaluate"""
+
+        X = np.atleast_2d(X)
+        parents = self.solver.population_energies if self.solver is not None else None
+        model = self.model() if parents is not None and len(parents) == len(X) else None
+        if model is None: # Initial population, or not enough data yet
+            values = np.asarray(evaluate(X), dtype=np.float64)
+            self.learn(X, values)
+            return values
+
+        estimate = np.expm1(model(self.unit(X)))
+        validation = self.validate > 0 and self.generation % self.validate == 0
+        order = np.argsort(estimate - parents, kind='stable') # Largest predicted improvement first
+        count = len(X) if validation else max(1, int(np.ceil(self.fraction * len(X))))
+        chosen, rest = (order[:count], order[int(np.ceil(self.fraction * len(X))):] if validation else order[count:])
+
+        values = np.maximum(estimate, np.nextafter(parents, np.inf))
+        values[chosen] = evaluate(X[chosen])
+        self.learn(X[chosen], values[chosen])
+
+        # Statistics: share of the evaluated trials that did improve on their parent, error of the estimates, and on
+        # validation generations the share of the trials the screen would have skipped that improved
+        improved = values < parents
+        row = [self.generation, len(X), count, improved[chosen].mean(),
+               np.median(abs(estimate[chosen] - values[chosen]) / np.maximum(abs(values[chosen]), 1e-9)),
+               improved[rest].mean() if validation and len(rest) else '']
+        if self.path is not None:
+            with open(self.path, 'a', newline="") as csvfile:
+                csv.writer(csvfile).writerow(row)
+
+        return values
+
+    def map(self, map):
+        """Map-like callable for differential_evolution(workers=...)"""
+
+        def screened(func, iterable):
+            return list(self.screen(np.array(list(iterable)), lambda X: map(func, list(X))))
+
+        return screened
+
+    def vectorised(self, evaluate):
+        """Objective for differential_evolution(vectorized=True) from one of (N, S) trials"""
+
+        def screened(xs):
+            return self.screen(np.asarray(xs).transpose(), lambda X: evaluate(X.transpose()))
+
+        return screened
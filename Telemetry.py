@@ -0,0 +1,95 @@
+# Convergence telemetry of the differential evolution and stopping rules for stagnating runs
+# Licensed under the MIT Licence
+
+from functools import partial
+import datetime as dt
+import numpy as np
+import csv
+import os
+
+columns = ('generation', 'wall time', 'evaluations per second', 'best objective', 'median objective', 'best LCOE',
+           'PenDeficit', 'PenEnergy', 'PenPower', 'PenDC', 'spread')
+
+def Path(suffix):
+    """Telemetry file of a scenario, e.g. Results/telemetry_APG_Full_HVAC_5_True_True.csv"""
+    return 'Results/telemetry{}'.format(suffix)
+
+class Telemetry:
+    """Checkpoint.Solve callback appending one row per generation (see columns) to Results/telemetry_*.csv and applying
+    the stopping rules. The penalties of the best candidate are evaluated again whenever it changes, by one worker of
+    the pool or in this process without one. Spread is the mean standard deviation of the population in units of ub - lb.
+    Evaluations per second counts the full simulations of the pool's workers, so not the trials skipped by the surrogate
+    screen, found in the memo or cut short, and without a pool the calls of the objective (solver nfev). The solver
+    searches the free decision variables of the context"""
+
+    def __init__(self, context, pool=None, rules=(), path=None):
+        self.context, self.pool, self.rules = (context, pool, rules)
+        self.path = path if path is not None else Path(context.suffix)
+        self.history = []
+        self.starttime = self.last = dt.datetime.now()
+        self.best, self.values = (None, None)
+        self.evaluations = self.pool.counts[2] if pool is not None else None # Unknown before the solver's first generation
+
+        if not os.path.exists(self.path):
+            with open(self.path, 'w', newline="") as csvfile:
+                csv.writer(csvfile).writerow(columns)
+
+    def __call__(self, solver, nit):
+        from Objective import Evaluate
+
+        now = dt.datetime.now()
+        energies = solver.population_energies
+        evaluations = self.count(solver)
+        rate = (evaluations - self.evaluations) / max((now - self.last).total_seconds(), 1e-9) if self.evaluations is not None else np.nan
+        if self.best is None or energies[0] != self.best:
+            self.best = energies[0]
+            evaluate = partial(Evaluate, context=self.context)
+            x = self.context.expand(solver.x)
+            self.values = self.pool.map(evaluate, [x])[0] if self.pool is not None else evaluate(x)
+            evaluations = self.count(solver) # Not the evaluation of the best just above
+
+        row = [nit, (now - self.starttime).total_seconds(), rate,
+               energies[0], np.median(energies), self.values[-1]] + list(self.values[2:6]) + [solver.population.std(axis=0).mean()]
+        self.history.append(dict(zip(columns, row)))
+        self.last, self.evaluations = (dt.datetime.now(), evaluations) # Nor its time
+
+        with open(self.path, 'a', newline="") as csvfile:
+            csv.writer(csvfile).writerow(row)
+
+        for rule in self.rules:
+            reason = rule(self.history)
+            if reason:
+                print('Stopping at generation {}: {}'.format(nit, reason))
+                return True
+
+        return False
+
+    def state(self):
+        """History of the stopping rules for Checkpoint.Save"""
+        return {'history': self.history}
+
+    def restore(self, solver, nit, state):
+        """Continue the stopping rules from a checkpoint"""
+        self.history = list(state['history'])
+
+    def count(self, solver):
+        """Evaluations so far: the full simulations of the pool, or the objective calls of the solver"""
+        return self.pool.counts[2] if self.pool is not None else solver._nfev
+
+class Stagnation:
+    """Stopping rule: the best objective improved by no more than epsilon (relative) over the last generations. With
+    feasible=True the generations count only while the best candidate has no penalties"""
+
+    def __init__(self, generations, epsilon, feasible=False):
+        self.generations, self.epsilon, self.feasible = (generations, epsilon, feasible)
+
+    def __call__(self, history):
+        recent = history[-self.generations - 1:]
+        if len(recent) <= self.generations:
+            return None
+        if self.feasible and any(sum(row[name] for name in ('PenDeficit', 'PenEnergy', 'PenPower', 'PenDC')) > 0 for row in recent):
+            return None
+        first, last = (recent[0]['best objective'], recent[-1]['best objective'])
+        if first - last <= self.epsilon * abs(first):
+            return '{}improvement of at most {:g} in {} generations'.format('feasible, ' if self.feasible else '', self.epsilon, self.generations)
+        return None
@@ -0,0 +1,143 @@
+# Persistent pool of worker processes with the scenario inputs loaded once per worker
+# Licensed under the MIT Licence
+
+from multiprocessing import get_context, cpu_count
+from Shared import Publish, Attach, Handle, Memory, Report
+from functools import partial
+import numpy as np
+import importlib
+import traceback
+import threading
+import Checkpoint
+import Record
+import queue
+import Memo
+import os
+
+start_method = os.environ.get('FIRM_START_METHOD') # fork, spawn or forkserver; None for the platform default
+preload = ('Input', 'Objective') # Modules imported by each worker when it starts
+timeout = float(os.environ.get('FIRM_START_TIMEOUT', 900)) # Seconds to wait for each worker to start, including the numba compilation
+barrier = None # Of the broadcast tasks of the pool, one per worker
+
+def Initialise(config, handles, ready, recording, generation, memo, cutoff, counts, synchronise):
+    """Pool initializer: build the scenario context, attach it to the shared arrays and compile the storage dispatch
+    kernel, all before the first task arrives. A failure is reported on the ready queue before it is raised"""
+
+    try:
+        before = Memory()
+        for name in preload:
+            importlib.import_module(name)
+
+        global barrier
+        barrier = synchronise
+        Handle(Record.Flush)
+
+        import Objective
+        Record.Configure(recording, generation)
+        Memo.Configure(memo)
+        Objective.Configure(cutoff, counts)
+
+        from Input import Context
+        Attach(handles, [Context(**config)]) # Tasks unpickle their context to this cached instance
+
+        from Simulation import Simulate
+        Simulate(np.zeros((1, 2)), 1., 1., 1., 1., 0.8, 0.9, 1.) # Warm-up; the numba kernel compiles or loads from cache here
+    except Exception:
+        ready.put(traceback.format_exc())
+        raise
+
+    ready.put((os.getpid(), before, Memory()))
+
+def Broadcast(func):
+    """Task of WorkerPool.broadcast: wait until every worker holds one, so each runs func exactly once"""
+
+    try:
+        barrier.wait(timeout=60)
+    except threading.BrokenBarrierError: # A worker replaced meanwhile; run func here regardless
+        pass
+
+    return func()
+
+class WorkerPool:
+    """pool = WorkerPool(context.config(), arrays={'MLoad': context.MLoad, ...}) starts the workers once; pool.map is
+    passed to Checkpoint.Solve(..., [pool.advance], workers=pool.map) and the same pool is reused by Fill and
+    Dispatch. recording is the Config.Policy of the evaluation log"""
+
+    def __init__(self, config, processes=None, arrays=None, method=start_method, recording=('all', None)):
+        self.mp = mp = get_context(method)
+        self.processes = processes if processes is not None else cpu_count()
+        ready = mp.Queue()
+        handles = Publish(arrays) if arrays else {}
+        self.generation = mp.RawValue('i', 0) # Read by the workers to end their buffered generation
+        self.cutoff = mp.RawValue('d', np.inf) # Objective above which the workers may stop a simulation, see Objective.Cutoff
+        self.counts = mp.Array('i', 3) # Evaluations cut short by the analytic bounds and by the partial simulation, full simulations
+        self.barrier = mp.Barrier(self.processes)
+        Handle(Record.Flush)
+
+        self.manager, self.memo = (None, None)
+        if Memo.mode == 'shared': # One objective cache for all workers, held by a server process
+            self.manager = Memo.Manager(ctx=mp)
+            self.manager.start()
+            self.memo = self.manager.LRU(Memo.size)
+
+        self.pool = mp.Pool(processes=self.processes, initializer=Initialise,
+                            initargs=(dict(config), handles, ready, tuple(recording), self.generation, self.memo, self.cutoff, self.counts, self.barrier))
+        self.workers = sorted(self.ready(ready) for i in range(self.processes)) # Wait until every worker is ready
+
+    def ready(self, ready):
+        """The start report of the next worker. mp.Pool replaces a worker whose initializer fails, so a failure would
+        otherwise be waited for forever: the pool is terminated and the error raised here"""
+
+        try:
+            report = ready.get(timeout=timeout)
+        except queue.Empty:
+            report = 'No worker ready after {:g} s (FIRM_START_TIMEOUT)'.format(timeout)
+        if isinstance(report, str):
+            self.pool.terminate()
+            if self.manager is not None:
+                self.manager.shutdown()
+            raise RuntimeError('Worker failed to start:\n{}'.format(report))
+
+        return report
+
+    def map(self, func, iterable):
+        """Map-like callable for differential_evolution(workers=...)"""
+        return self.pool.map(func, iterable)
+
+    def broadcast(self, func):
+        """Run func, e.g. Record.Flush, once in every worker; returns their results"""
+
+        results = self.pool.map(Broadcast, [func] * self.processes, chunksize=1)
+        if self.barrier.broken:
+            self.barrier.reset()
+
+        return results
+
+    def advance(self, *args):
+        """Generation callback: the next evaluations belong to a new generation. Every worker ends the generation in
+        its evaluation log and writes the buffered records every Record.every generations and with each checkpoint,
+        every Checkpoint.interval generations"""
+
+        self.generation.value += 1
+        g = self.generation.value
+        self.broadcast(partial(Record.End, flush=(Record.every > 0 and g % Record.every == 0) or (Checkpoint.interval > 0 and g % Checkpoint.interval == 0)))
+
+    def report(self):
+        """Per-worker memory use, and the hits and misses of the shared objective cache"""
+        if self.memo is not None:
+            hits, misses = self.memo.stats()[:2]
+            print('Shared memo: {} hits, {} misses'.format(hits, misses))
+        return Report(self.workers)
+
+    def close(self):
+        """Let the workers exit normally, so they flush their buffered evaluation logs"""
+        self.pool.close()
+        self.pool.join()
+        if self.manager is not None:
+            self.manager.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,28 +1,3 @@
 #!/bin/bash
-python3 Optimisation.py -e 5 -n APG_BMY_Only -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_BMY_Only -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_BMY_Only -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 5 -n APG_BMY_Only -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_BMY_Only -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_BMY_Only -s HVAC -b True -H True -i 2000 -p 5
-
-python3 Optimisation.py -e 5 -n APG_PMY_Only -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_PMY_Only -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_PMY_Only -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 5 -n APG_PMY_Only -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_PMY_Only -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_PMY_Only -s HVAC -b True -H True -i 2000 -p 5
-
-python3 Optimisation.py -e 5 -n APG_MY_Isolated -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_MY_Isolated -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_MY_Isolated -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 5 -n APG_MY_Isolated -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_MY_Isolated -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_MY_Isolated -s HVAC -b True -H True -i 2000 -p 5
-
-python3 Optimisation.py -e 5 -n APG_Full -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_Full -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_Full -s HVAC -b True -H False -i 2000 -p 5
-python3 Optimisation.py -e 5 -n APG_Full -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 10 -n APG_Full -s HVAC -b True -H True -i 2000 -p 5
-python3 Optimisation.py -e 20 -n APG_Full -s HVAC -b True -H True -i 2000 -p 5
\ No newline at end of file
+# All 24 scenarios of cmds.txt on the cores of this machine, largest first; finished scenarios are skipped on rerun
+python3 Scheduler.py -e 5 10 20 -n APG_Full APG_MY_Isolated APG_PMY_Only APG_BMY_Only -s HVAC -b True -H False True -i 2000 -p 5
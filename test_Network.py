@@ -0,0 +1,50 @@
+# Tests of the matrix transmission model against the original per-node loop
+# Licensed under the MIT Licence
+
+import numpy as np
+import pytest
+import os
+
+directory = os.path.dirname(os.path.abspath(__file__))
+pytestmark = pytest.mark.skipif(not all(os.path.exists(os.path.join(directory, 'Data', name)) for name in ('electricity5.csv', 'pv.csv')),
+                                reason='needs the scenario data in Data/')
+
+@pytest.fixture(autouse=True)
+def data(monkeypatch):
+    """Input reads Data/ relative to the working directory"""
+    monkeypatch.chdir(directory)
+
+def Dispatch(x, context):
+    """Solution of x after the simulation with all flexible supply, as Transmission finds it in Objective.Cost"""
+
+    from Input import Solution
+    from Objective import Flexible
+    from Simulation import Reliability
+
+    S = Solution(x, context)
+    hydro, bio, gas = Flexible(np.nan_to_num(np.array(S.CGas)).sum(), context)
+    Reliability(S, hydro=hydro[3], bio=bio[3], gas=gas[3])
+
+    return S
+
+@pytest.mark.parametrize('node', ['APG_Full', 'APG_PMY_Only', 'APG_BMY_Only', 'APG_MY_Isolated', 'SB', 'SW'])
+def test_random_solutions(node):
+    from Input import Context
+    from Network import Transmission, Reference
+
+    C = Context(node, 'HVAC', 5, True, True)
+    lb, ub = (np.array(C.lb), np.array(C.ub))
+    rng = np.random.default_rng(0)
+    for i in range(3):
+        S = Dispatch(lb + rng.random(len(lb)) * (ub - lb), C)
+        reference = Reference(S, output=True)
+        M = {name: getattr(S, name).copy() for name in ('MPV', 'MInter', 'MHydro', 'MBio', 'MGas', 'MDischargePH', 'MChargePH',
+                                                        'MStoragePH', 'MDischargeB', 'MChargeB', 'MStorageB', 'MDeficit', 'MSpillage')}
+        TDC = Transmission(S, output=True)
+
+        assert TDC.shape == reference.shape
+        assert abs(TDC - reference).max() <= 1e-6
+        for name, value in M.items():
+            assert abs(getattr(S, name) - value).max() <= 1e-6, name
+        if len(C.coverage) <= 1:
+            assert not TDC.any() # No lines within a single node
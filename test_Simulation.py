@@ -0,0 +1,123 @@
+# Tests of the storage dispatch kernels against the original interval loop
+# Licensed under the MIT Licence
+
+import numpy as np
+import pytest
+from Simulation import Scan, Simulate, tolerance
+
+efficiencyPH, efficiencyB, resolution = (0.8, 0.9, 1)
+names = ('DischargePH', 'ChargePH', 'StoragePH', 'DischargeB', 'ChargeB', 'StorageB', 'Deficit_energy', 'Deficit_power')
+
+def Lanes(lanes, length, seed=0):
+    """Random (K, t) net-load lanes alternating surpluses and shortfalls, with capacities (K) that fill and empty"""
+
+    rng = np.random.default_rng(seed)
+    Netload = rng.normal(0, 1000, (lanes, length)) + 300 * np.sin(np.arange(length) * 2 * np.pi / 24)
+    capacities = [rng.uniform(100, 1500, lanes), rng.uniform(500, 20000, lanes), rng.uniform(50, 800, lanes), rng.uniform(100, 4000, lanes)]
+
+    return Netload, capacities
+
+def Ties(reference, capacities):
+    """(K, t) intervals where the PHES or battery discharge meets both its power and its energy limit within tolerance"""
+
+    ties = np.zeros(reference[0].shape, dtype=bool)
+    for Discharge, Storage, Pcapacity, Scapacity in ((reference[0], reference[2], capacities[0], capacities[1]), (reference[3], reference[5], capacities[2], capacities[3])):
+        Storage_t1 = np.concatenate([0.5 * np.asarray(Scapacity, dtype=np.float64)[:, None], Storage[:, :-1]], axis=1)
+        ties |= (abs(Discharge - np.asarray(Pcapacity)[:, None]) <= tolerance) & (abs(Discharge - Storage_t1 / resolution) <= tolerance) & (Discharge > 0)
+
+    return ties
+
+def Compare(Netload, capacities, chunks):
+    """Scan and reference results of the same lanes: storage within tolerance, and deficits too except at ties"""
+
+    scan = Scan(Netload, *[np.asarray(x, dtype=np.float64) for x in capacities], efficiencyPH, efficiencyB, resolution, chunks=chunks)
+    reference = Simulate(Netload, *capacities, efficiencyPH, efficiencyB, resolution, kernel='reference')
+
+    for name, x, y in zip(names[:6], scan, reference):
+        assert abs(x - y).max() <= tolerance, name
+
+    # Where a discharge meets both limits within rounding the branch of the deficit classification can differ, and
+    # with it the deficit by the battery's net discharge (diff1 - diff2); see the FIRM_KERNEL notes in Simulation
+    ties = Ties(reference, capacities)
+    for name, x, y in zip(names[6:], scan[6:], reference[6:]):
+        assert abs(x - y)[~ties].max(initial=0) <= tolerance, name
+    difference = abs((scan[6] + scan[7]) - (reference[6] + reference[7]))[ties]
+    assert (difference <= abs(reference[3] - reference[4])[ties] + tolerance).all()
+    assert ties.mean() < 1e-3
+
+    return scan, reference
+
+@pytest.mark.parametrize('chunks', [1, 3, 7, 16])
+def test_random_lanes(chunks):
+    Netload, capacities = Lanes(6, 1000)
+    scan, reference = Compare(Netload, capacities, chunks)
+
+    assert (reference[6] + reference[7]).sum() > 0 # Some deficits to compare
+
+@pytest.mark.parametrize('seed', [3, 4])
+def test_full_year(seed):
+    """Lanes of two years, long enough for the discharge limits to tie within rounding (seed 3 at t=5123)"""
+
+    Netload, capacities = Lanes(5, 17520, seed=seed)
+    Compare(Netload, capacities, 8)
+
+@pytest.mark.parametrize('length, chunks', [(997, 8), (101, 10), (5, 8), (1, 4)])
+def test_chunks_not_dividing(length, chunks):
+    Netload, capacities = Lanes(3, length, seed=length)
+    Compare(Netload, capacities, chunks)
+
+def test_zero_capacity_lanes():
+    Netload, capacities = Lanes(4, 500, seed=1)
+    capacities[0][0] = capacities[1][0] = 0 # No PHES
+    capacities[2][1] = capacities[3][1] = 0 # No battery
+    capacities[1][2] = capacities[3][2] = 0 # Power without energy
+    capacities[0][3] = capacities[1][3] = capacities[2][3] = capacities[3][3] = 0 # No storage
+    scan, reference = Compare(Netload, capacities, 4)
+
+    assert not scan[2][0].any() and not scan[5][1].any() and not scan[2][2].any() and not scan[5][2].any()
+    assert abs(scan[6][3] + scan[7][3] - np.maximum(Netload[3], 0)).max() <= tolerance
+
+def test_PHES_before_battery():
+    """The battery only serves the residual diff1 of the PHES"""
+
+    Netload = np.array([[500., 500., 1500., -300., -2000., 800.]] * 2)
+    capacities = [np.array([1000., 0.]), np.array([1e6, 0.]), np.array([1000., 1000.]), np.array([1e6, 1e6])]
+    scan, reference = Compare(Netload, capacities, 2)
+
+    # With ample PHES the battery covers only what exceeds its power, and charges only from the surplus beyond it
+    assert np.allclose(scan[0][0], [500, 500, 1000, 0, 0, 800]) and np.allclose(scan[3][0], [0, 0, 500, 0, 0, 0])
+    assert np.allclose(scan[1][0], [0, 0, 0, 300, 1000, 0]) and np.allclose(scan[4][0], [0, 0, 0, 0, 1000, 0])
+    # Without PHES the battery takes the whole net load
+    assert np.allclose(scan[3][1], np.maximum(Netload[1], 0).clip(max=1000))
+
+@pytest.mark.parametrize('kernel, lanes, length', [('python', 6, 2000), ('python', 20, 2000), ('numpy', 6, 2000),
+                                                   ('numba', 6, 2000), ('python', 5, 17520), ('numba', 5, 17520)])
+def test_sequential_kernels(kernel, lanes, length):
+    """The sequential kernels agree with the reference in everything, deficits included, also where 'scan' ties"""
+
+    if kernel == 'numba':
+        pytest.importorskip('numba')
+    Netload, capacities = Lanes(lanes, length, seed=3)
+    result = Simulate(Netload, *capacities, efficiencyPH, efficiencyB, resolution, kernel=kernel)
+    reference = Simulate(Netload, *capacities, efficiencyPH, efficiencyB, resolution, kernel='reference')
+
+    for name, x, y in zip(names, result, reference):
+        assert abs(x - y).max() <= tolerance, name
+
+@pytest.mark.parametrize('kernel', ['python', 'numba'])
+def test_deficit_limit(kernel):
+    """With a limit a lane is the reference up to the interval its cumulative deficit exceeds it, then zero"""
+
+    if kernel == 'numba':
+        pytest.importorskip('numba')
+    Netload, capacities = Lanes(4, 1000, seed=2)
+    reference = Simulate(Netload, *capacities, efficiencyPH, efficiencyB, resolution, kernel='reference')
+    deficit = np.cumsum(reference[6] + reference[7], axis=1) * resolution
+    limit = np.median(deficit[:, -1])
+    result = Simulate(Netload, *capacities, efficiencyPH, efficiencyB, resolution, kernel=kernel, limit=limit)
+
+    for k in range(len(Netload)):
+        stop = np.argmax(deficit[k] > limit) if deficit[k, -1] > limit else len(Netload[k]) - 1
+        for name, x, y in zip(names, result, reference):
+            assert abs(x[k, :stop + 1] - y[k, :stop + 1]).max() <= tolerance, name
+            assert not x[k, stop + 1:].any(), name